@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from src.config import load_config
+from src.data.dataset_utils import list_image_files
+from src.detection.benchmark import compare_to_baseline, expand_cases, run_benchmark
+from src.utils.logger import configure_logger
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark latency, throughput, memory and accuracy of trained weights."
+    )
+    parser.add_argument("--config", default="configs/benchmark.yaml", help="Benchmark config path.")
+    parser.add_argument("--weights", default="models/best.pt", help="Weights to benchmark.")
+    parser.add_argument("--output", default=None, help="Override report destination.")
+    parser.add_argument("--baseline", default=None, help="Override baseline report to compare against.")
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store this run as the new baseline instead of gating against the old one.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cfg = load_config(args.config)
+    logger = configure_logger("benchmark")
+
+    bench_cfg = cfg["benchmark"]
+    accuracy_cfg = cfg.get("accuracy", {})
+    outputs_cfg = cfg.get("outputs", {})
+    gating_cfg = cfg.get("gating", {})
+
+    data_cfg = load_config(accuracy_cfg.get("data_config", "configs/yolo_data.yaml"))
+    split = accuracy_cfg.get("split", "val")
+    image_dir = Path(data_cfg["path"]) / data_cfg[split]
+    images = list_image_files(image_dir)[: bench_cfg.get("num_images", 16)]
+    if not images:
+        raise FileNotFoundError(f"No benchmark images found in {image_dir}")
+
+    cases = expand_cases(
+        bench_cfg.get("backends", ["pytorch"]),
+        bench_cfg.get("imgsz", [1280]),
+        bench_cfg.get("batch", [1]),
+        bench_cfg.get("threads", [1]),
+    )
+    report = run_benchmark(
+        weights=args.weights,
+        cases=cases,
+        images=images,
+        data_config=accuracy_cfg.get("data_config") if accuracy_cfg.get("enabled", True) else None,
+        split=split,
+        device=bench_cfg.get("device", "cpu"),
+        warmup=bench_cfg.get("warmup", 3),
+        iterations=bench_cfg.get("iterations", 30),
+        work_dir=bench_cfg.get("work_dir", "experiments/benchmark"),
+    )
+
+    report_path = Path(args.output or outputs_cfg.get("report", "reports/benchmark.json"))
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    logger.info("Benchmark report saved -> %s", report_path)
+
+    baseline_path = Path(args.baseline or outputs_cfg.get("baseline", "reports/benchmark_baseline.json"))
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        logger.info("Baseline updated -> %s", baseline_path)
+        return
+    if not baseline_path.exists():
+        logger.warning("No baseline at %s; run with --update-baseline to create one.", baseline_path)
+        return
+
+    regressions = compare_to_baseline(
+        report,
+        json.loads(baseline_path.read_text(encoding="utf-8")),
+        latency_metric=gating_cfg.get("latency_metric", "p95"),
+        max_latency_regression=gating_cfg.get("max_latency_regression", 0.10),
+        max_map50_drop=gating_cfg.get("max_map50_drop", 0.01),
+    )
+    if regressions:
+        for message in regressions:
+            logger.error("Regression: %s", message)
+        sys.exit(1)
+    logger.info("No regressions against %s", baseline_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from src.config import load_config
+from src.data.image_cache import build_image_cache, cache_dir_for
+from src.utils.logger import configure_logger
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Decode YOLO split images once into letterboxed, memory-mappable shards."
+    )
+    parser.add_argument("--train-config", default="configs/train.yaml", help="Training config path.")
+    parser.add_argument(
+        "--splits",
+        nargs="+",
+        default=["train", "val", "test"],
+        help="Keys from the YOLO data config to cache.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cfg = load_config(args.train_config)
+    logger = configure_logger("build_image_cache")
+
+    cache_cfg = cfg.get("image_cache", {})
+    cache_root = Path(cache_cfg.get("root", "data/processed/yolo_cache"))
+    imgsz = cfg["training"]["imgsz"]
+    data_cfg = load_config(cfg["paths"]["data_config"])
+    data_root = Path(data_cfg["path"])
+
+    for split in args.splits:
+        if not data_cfg.get(split):
+            continue
+        image_dir = data_root / data_cfg[split]
+        if not image_dir.exists():
+            logger.warning("Skipping %s: %s does not exist", split, image_dir)
+            continue
+        build_image_cache(
+            image_dir=image_dir,
+            cache_dir=cache_dir_for(cache_root, image_dir),
+            imgsz=imgsz,
+            shard_size=cache_cfg.get("shard_size", 256),
+            workers=cache_cfg.get("workers", 8),
+        )
+
+
+if __name__ == "__main__":
+    main()
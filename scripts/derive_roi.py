@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import argparse
+import csv
+from pathlib import Path
+from typing import List
+
+import yaml
+
+from src.detection.roi import derive_roi
+from src.utils.logger import configure_logger
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Derive a camera ROI polygon from historical tracking log density."
+    )
+    parser.add_argument("--logs", nargs="+", required=True, help="Tracking CSVs with xmin/ymin/xmax/ymax.")
+    parser.add_argument(
+        "--frame-size",
+        nargs=2,
+        type=int,
+        required=True,
+        metavar=("WIDTH", "HEIGHT"),
+        help="Frame size the logs were recorded at.",
+    )
+    parser.add_argument("--camera", default="bike_default", help="Camera entry to create or replace.")
+    parser.add_argument("--config", default="configs/roi.yaml", help="ROI config to update.")
+    parser.add_argument("--bands", type=int, default=8, help="Horizontal slices in the polygon.")
+    parser.add_argument("--coverage", type=float, default=0.98, help="Fraction of boxes the ROI must cover.")
+    parser.add_argument("--margin", type=float, default=0.03, help="Normalised padding around the fit.")
+    return parser.parse_args()
+
+
+def load_boxes(paths: List[str]) -> List[List[float]]:
+    boxes: List[List[float]] = []
+    for path in paths:
+        with Path(path).open("r", encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                boxes.append([float(row[key]) for key in ("xmin", "ymin", "xmax", "ymax")])
+    return boxes
+
+
+def main() -> None:
+    args = parse_args()
+    logger = configure_logger("derive_roi")
+
+    boxes = load_boxes(args.logs)
+    roi = derive_roi(
+        boxes,
+        frame_size=tuple(args.frame_size),
+        bands=args.bands,
+        coverage=args.coverage,
+        margin=args.margin,
+    )
+
+    config_path = Path(args.config)
+    cfg = {}
+    if config_path.exists():
+        cfg = yaml.safe_load(config_path.read_text(encoding="utf-8")) or {}
+    cfg.setdefault("default_camera", args.camera)
+    cfg.setdefault("cameras", {})[args.camera] = roi.to_config()
+    config_path.parent.mkdir(parents=True, exist_ok=True)
+    config_path.write_text(yaml.safe_dump(cfg, sort_keys=False), encoding="utf-8")
+    logger.info("Derived ROI for %s from %d boxes -> %s", args.camera, len(boxes), config_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,24 @@
 from __future__ import annotations
 
 import argparse
+import csv
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
 
 from tqdm import tqdm
 
 from src.config import load_config
-from src.data.dataset_utils import expected_label_path, list_image_files
+from src.data.dataset_utils import expected_label_path, file_digest, list_dataset_images
+from src.data.near_duplicates import PerceptualHashIndex
 from src.utils.logger import configure_logger
 
+TransferTask = Tuple[Path, Path]
+# (class_name, split, image_path, label_path)
+SamplePair = Tuple[str, str, Path, Path]
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -27,9 +36,54 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--strategy",
-        choices=["copy", "symlink"],
+        choices=["copy", "symlink", "hardlink"],
         default="copy",
-        help="Copy files (default) or create symlinks (faster, requires admin on Windows).",
+        help=(
+            "Copy files (default), create symlinks (faster, requires admin on Windows) "
+            "or hardlinks (no extra space, falls back to copy across filesystems)."
+        ),
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Re-transfer changed files and remove outputs that no longer have a source.",
+    )
+    parser.add_argument(
+        "--compare",
+        choices=["mtime", "hash"],
+        default="mtime",
+        help="How --sync detects changed files: size/mtime (fast) or content hash.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Number of threads used for file transfers and hashing.",
+    )
+    parser.add_argument(
+        "--dedupe",
+        choices=["off", "report", "exclude"],
+        default="off",
+        help=(
+            "Find near-duplicate frames by perceptual hash; 'exclude' drops images within "
+            "--dedupe-distance of a kept image of the same class, preferring the earliest split."
+        ),
+    )
+    parser.add_argument(
+        "--dedupe-distance",
+        type=int,
+        default=5,
+        help="Maximum Hamming distance (of 64 bits) for two frames to count as duplicates.",
+    )
+    parser.add_argument(
+        "--dedupe-report",
+        default="reports/near_duplicates.csv",
+        help="Destination CSV listing every near-duplicate cluster.",
+    )
+    parser.add_argument(
+        "--hash-cache",
+        default="data/processed/phash_cache.json",
+        help="Perceptual hash cache reused across runs.",
     )
     return parser.parse_args()
 
@@ -42,13 +96,148 @@ def ensure_split_dirs(root: Path, split: str) -> tuple[Path, Path]:
     return img_dir, lbl_dir
 
 
-def transfer_file(src: Path, dst: Path, strategy: str) -> None:
-    if dst.exists():
-        return
+def is_up_to_date(src: Path, dst: Path, strategy: str, compare: str) -> bool:
+    """Return True when ``dst`` already mirrors ``src`` for the given strategy."""
+    if dst.is_symlink():
+        return strategy == "symlink" and dst.resolve() == src.resolve()
+    if not dst.exists():
+        return False
+    if strategy == "symlink":
+        return False
+    if os.path.samefile(src, dst):
+        # A leftover hardlink aliases the source inode; under copy, edits to the
+        # prepared file would change the original dataset, so break the link.
+        return strategy == "hardlink"
+
+    src_stat = src.stat()
+    dst_stat = dst.stat()
+    if strategy == "hardlink" and src_stat.st_dev == dst_stat.st_dev:
+        # A full copy left from an earlier run; relink it to reclaim the space. Across
+        # filesystems hardlink falls back to copying, so those copies are compared below.
+        return False
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if compare == "hash":
+        return file_digest(src) == file_digest(dst)
+    # copy2 preserves mtime to the nanosecond; same-size label edits only show up here.
+    return src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+
+def transfer_file(
+    src: Path,
+    dst: Path,
+    strategy: str,
+    sync: bool = False,
+    compare: str = "mtime",
+) -> bool:
+    """Mirror ``src`` at ``dst``; returns True when anything was written."""
+    if sync:
+        if is_up_to_date(src, dst, strategy, compare):
+            return False
+    elif dst.exists() or dst.is_symlink():
+        return False
+
+    # Stage next to the destination and swap in atomically so readers never see
+    # a half-written file and hardlinked sources are never modified in place.
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    if tmp.exists() or tmp.is_symlink():
+        tmp.unlink()
     if strategy == "symlink":
-        dst.symlink_to(src.resolve())
+        tmp.symlink_to(src.resolve())
+    elif strategy == "hardlink":
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copy2(src, tmp)
     else:
-        shutil.copy2(src, dst)
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+    return True
+
+
+def remove_stale(directories: Iterable[Path], expected: Set[Path]) -> int:
+    removed = 0
+    for directory in directories:
+        if not directory.exists():
+            continue
+        for path in directory.iterdir():
+            if path.is_dir() or path in expected:
+                continue
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def find_near_duplicates(
+    pairs: Sequence[SamplePair],
+    splits: Sequence[str],
+    max_distance: int,
+    workers: int,
+    hash_cache: str | Path,
+    report_path: str | Path,
+) -> Set[Path]:
+    """Cluster near-duplicate images, write a report and return the redundant ones.
+
+    Connected clusters, across classes, are only used to report cross-split
+    leakage. Leaders are picked per class, since the same frame may be
+    annotated separately under several class folders. Within a class, images
+    are preferred from the earliest split in ``splits`` (train before val
+    before test) and an image is redundant only when it lies within
+    ``max_distance`` of a kept leader, so a gradually changing ride is not
+    collapsed to a single frame.
+    """
+    logger = configure_logger("prepare_dataset")
+    by_image: Dict[Path, SamplePair] = {pair[2]: pair for pair in pairs}
+    index = PerceptualHashIndex.build(by_image.keys(), workers=workers, cache_path=hash_cache)
+    split_rank = {split: rank for rank, split in enumerate(splits)}
+
+    redundant: Set[Path] = set()
+    leaking = 0
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with report_path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(
+            handle,
+            fieldnames=["cluster", "split", "class", "image", "hash", "keep", "duplicate_of"],
+        )
+        writer.writeheader()
+        for cluster_id, members in enumerate(index.clusters(max_distance)):
+            ordered = sorted(
+                members,
+                key=lambda i: (split_rank[by_image[index.paths[i]][1]], str(index.paths[i])),
+            )
+            if len({by_image[index.paths[i]][1] for i in ordered}) > 1:
+                leaking += 1
+            leaders: Dict[int, int] = {}
+            for cls in {by_image[index.paths[i]][0] for i in ordered}:
+                same_class = [i for i in ordered if by_image[index.paths[i]][0] == cls]
+                leaders.update(index.assign_leaders(same_class, max_distance))
+            for member in ordered:
+                cls, split, image_path, _ = by_image[index.paths[member]]
+                keep = leaders[member] == member
+                if not keep:
+                    redundant.add(image_path)
+                writer.writerow(
+                    {
+                        "cluster": cluster_id,
+                        "split": split,
+                        "class": cls,
+                        "image": image_path,
+                        "hash": f"{int(index.hashes[member]):016x}",
+                        "keep": keep,
+                        "duplicate_of": "" if keep else index.paths[leaders[member]],
+                    }
+                )
+
+    logger.info(
+        "Near-duplicates: %d redundant images across clusters, %d clusters span splits -> %s",
+        len(redundant),
+        leaking,
+        report_path,
+    )
+    if leaking:
+        logger.warning("%d near-duplicate clusters leak across splits", leaking)
+    return redundant
 
 
 def main() -> None:
@@ -64,42 +253,69 @@ def main() -> None:
     image_subdir = structure.get("image_subdir", "images")
     label_subdir = structure.get("label_subdir", "labels")
 
-    total_pairs = 0
-    for cls in classes:
-        for split in splits:
-            image_dir = dataset_root / cls / split / image_subdir
-            label_dir = dataset_root / cls / split / label_subdir
-            if not image_dir.exists():
-                continue
-            images = list_image_files(image_dir)
-            total_pairs += len(images)
-            target_img_dir, target_lbl_dir = ensure_split_dirs(output_root, split)
-
-            for image_path in tqdm(
-                images,
-                desc=f"{cls}-{split}",
-                unit="img",
+    pairs: List[SamplePair] = []
+    for cls, split, image_path in list_dataset_images(dataset_root, classes, splits, image_subdir):
+        label_path = expected_label_path(image_path, dataset_root / cls / split / label_subdir)
+        if not label_path.exists():
+            logger.warning("Missing label for %s", image_path)
+            continue
+        pairs.append((cls, split, image_path, label_path))
+
+    if args.dedupe != "off":
+        redundant = find_near_duplicates(
+            pairs,
+            splits,
+            max_distance=args.dedupe_distance,
+            workers=args.workers,
+            hash_cache=args.hash_cache,
+            report_path=args.dedupe_report,
+        )
+        if args.dedupe == "exclude":
+            pairs = [pair for pair in pairs if pair[2] not in redundant]
+            if not args.sync:
+                logger.info("Run with --sync to also delete previously prepared duplicates.")
+
+    split_dirs = {split: ensure_split_dirs(output_root, split) for split in {pair[1] for pair in pairs}}
+    tasks: List[TransferTask] = []
+    for cls, split, image_path, label_path in pairs:
+        target_img_dir, target_lbl_dir = split_dirs[split]
+        new_stem = f"{cls}_{image_path.stem}"
+        tasks.append((image_path, target_img_dir / f"{new_stem}{image_path.suffix.lower()}"))
+        tasks.append((label_path, target_lbl_dir / f"{new_stem}.txt"))
+    total_pairs = len(pairs)
+
+    def run_task(task: TransferTask) -> bool:
+        src, dst = task
+        return transfer_file(src, dst, args.strategy, sync=args.sync, compare=args.compare)
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        transferred = sum(
+            tqdm(
+                pool.map(run_task, tasks),
+                total=len(tasks),
+                desc="transfer",
+                unit="file",
                 leave=False,
-            ):
-                label_path = expected_label_path(image_path, label_dir)
-                if not label_path.exists():
-                    logger.warning("Missing label for %s", image_path)
-                    continue
-
-                new_stem = f"{cls}_{image_path.stem}"
-                dest_image = target_img_dir / f"{new_stem}{image_path.suffix.lower()}"
-                dest_label = target_lbl_dir / f"{new_stem}.txt"
-                transfer_file(image_path, dest_image, args.strategy)
-                transfer_file(label_path, dest_label, args.strategy)
+            )
+        )
+
+    removed = 0
+    if args.sync:
+        expected = {dst for _, dst in tasks}
+        removed = remove_stale(
+            [output_root / split / sub for split in splits for sub in ("images", "labels")],
+            expected,
+        )
 
     logger.info(
-        "Prepared dataset -> %s (strategy=%s, pairs=%d)",
+        "Prepared dataset -> %s (strategy=%s, pairs=%d, transferred=%d, removed=%d)",
         output_root,
         args.strategy,
         total_pairs,
+        transferred,
+        removed,
     )
 
 
 if __name__ == "__main__":
     main()
-
@@ -5,6 +5,7 @@ import argparse
 from ultralytics import YOLO
 
 from src.config import load_config
+from src.training.cached_dataset import cached_validator
 from src.utils.logger import configure_logger
 
 
@@ -12,6 +13,7 @@ def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Run validation on trained weights.")
     parser.add_argument("--train-config", default="configs/train.yaml", help="Training config path.")
     parser.add_argument("--weights", default="models/best.pt", help="Weights to evaluate.")
+    parser.add_argument("--no-cache", action="store_true", help="Decode images instead of reading cache shards.")
     return parser.parse_args()
 
 
@@ -19,10 +21,15 @@ def main() -> None:
     args = parse_args()
     cfg = load_config(args.train_config)
     data_config = cfg["paths"]["data_config"]
+    cache_cfg = cfg.get("image_cache", {})
     logger = configure_logger("validate")
 
+    validator = None
+    if cache_cfg.get("enabled", False) and not args.no_cache:
+        validator = cached_validator(cache_cfg.get("root", "data/processed/yolo_cache"))
+
     model = YOLO(args.weights)
-    metrics = model.val(data=data_config)
+    metrics = model.val(data=data_config, imgsz=cfg["training"]["imgsz"], validator=validator)
     logger.info("Validation metrics: %s", metrics)
 
 
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import json
+import tarfile
+import zipfile
+from pathlib import PurePosixPath
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+METADATA_NAME = "metadata.json"
+
+# (filename, decoded BGR image or None when undecodable)
+DecodedImage = Tuple[str, Optional[np.ndarray]]
+
+
+def decode_image(data: bytes) -> Optional[np.ndarray]:
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def parse_metadata(raw: str | bytes) -> Dict[str, Dict]:
+    """Parse a filename -> fields mapping; raises ``ValueError`` unless it is a JSON object."""
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError(f"metadata must be a JSON object, got {type(data).__name__}")
+    return data
+
+
+def _is_image(name: str) -> bool:
+    return PurePosixPath(name).suffix.lower() in IMAGE_SUFFIXES
+
+
+def iter_archive(
+    handle: IO[bytes],
+    filename: str,
+    metadata: Dict[str, Dict],
+) -> Iterator[DecodedImage]:
+    """Decode images one member at a time from a zip or tar upload.
+
+    A ``metadata.json`` member, if present, is merged into ``metadata``;
+    ``ValueError`` is raised when it is not a JSON object.
+    """
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(handle) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                if PurePosixPath(info.filename).name == METADATA_NAME:
+                    metadata.update(parse_metadata(archive.read(info)))
+                elif _is_image(info.filename):
+                    yield info.filename, decode_image(archive.read(info))
+        return
+
+    # Stream mode reads members sequentially without seeking the upload.
+    with tarfile.open(fileobj=handle, mode="r|*") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            extracted = archive.extractfile(member)
+            if extracted is None:
+                continue
+            if PurePosixPath(member.name).name == METADATA_NAME:
+                metadata.update(parse_metadata(extracted.read()))
+            elif _is_image(member.name):
+                yield member.name, decode_image(extracted.read())
+
+
+def batched(items: Iterator[DecodedImage], size: int) -> Iterator[List[DecodedImage]]:
+    batch: List[DecodedImage] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
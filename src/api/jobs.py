@@ -0,0 +1,541 @@
+from __future__ import annotations
+
+import argparse
+import json
+import signal
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import cv2
+
+from src.config import load_config
+from src.detection.roi import RegionOfInterest, load_rois
+from src.utils.logger import configure_logger, configure_logging, log_context
+from src.utils.tracing import parse_trace_mode, trace_run
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+STATUSES = (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)
+RETRYABLE = (FAILED, CANCELLED)
+# Worker-side updates only apply while that worker still owns the job, so a worker
+# that was presumed dead (and whose job was requeued) cannot overwrite the rerun.
+_OWNED = "status = 'running' AND worker = ?"
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    source_path TEXT NOT NULL,
+    camera TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    frames_processed INTEGER NOT NULL DEFAULT 0,
+    total_frames INTEGER,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    error TEXT,
+    result_dir TEXT,
+    artifacts TEXT,
+    trace TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class JobCancelled(Exception):
+    """Raised from the progress callback to abort a running job."""
+
+
+@dataclass
+class Job:
+    id: str
+    status: str
+    source_path: str
+    camera: Optional[str]
+    created_at: float
+    updated_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    attempts: int
+    max_attempts: int
+    frames_processed: int
+    total_frames: Optional[int]
+    cancel_requested: bool
+    worker: Optional[str]
+    error: Optional[str]
+    result_dir: Optional[str]
+    artifacts: Dict[str, str]
+    trace: Optional[str]
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        data = dict(row)
+        data["cancel_requested"] = bool(data["cancel_requested"])
+        data["artifacts"] = json.loads(data["artifacts"]) if data["artifacts"] else {}
+        return cls(**data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("source_path")
+        data["progress"] = (
+            min(self.frames_processed / self.total_frames, 1.0) if self.total_frames else None
+        )
+        return data
+
+
+class JobStore:
+    """Durable tracking-job queue in a local SQLite file.
+
+    Each call opens its own connection so the store can be shared between the
+    API's event loop, worker threads and separate worker processes on the same
+    host. Claims run inside ``BEGIN IMMEDIATE`` so two workers never take the
+    same job.
+    """
+
+    def __init__(self, db_path: str | Path, stale_after_s: float = 300.0) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.stale_after_s = stale_after_s
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "trace" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN trace TEXT")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, where: str = "", params: tuple = (), **fields: Any) -> bool:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        query = f"UPDATE jobs SET {assignments} WHERE id = ?{' AND ' + where if where else ''}"
+        with self._connect() as conn:
+            cursor = conn.execute(query, (*fields.values(), job_id, *params))
+        return cursor.rowcount > 0
+
+    def submit(
+        self,
+        source_path: str | Path,
+        camera: Optional[str] = None,
+        max_attempts: int = 3,
+        job_id: Optional[str] = None,
+        trace: Optional[str] = None,
+    ) -> Job:
+        job_id = job_id or new_job_id()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, source_path, camera, created_at, updated_at, max_attempts, trace) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, str(source_path), camera, now, now, max_attempts, trace),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Job]:
+        query = "SELECT * FROM jobs"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._connect() as conn:
+            rows = conn.execute(query, (*params, limit)).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Atomically move the oldest queued job to ``running`` for ``worker``."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose worker stopped heartbeating (crash, kill -9) go back on the queue.
+                conn.execute(
+                    "UPDATE jobs SET status = CASE WHEN attempts < max_attempts THEN ? ELSE ? END, "
+                    "finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END, "
+                    "error = 'worker stopped responding', worker = NULL, updated_at = ? "
+                    "WHERE status = ? AND updated_at < ?",
+                    (QUEUED, FAILED, now, now, RUNNING, now - self.stale_after_s),
+                )
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, "
+                    "started_at = ?, updated_at = ?, frames_processed = 0, error = NULL "
+                    "WHERE id = ?",
+                    (RUNNING, worker, now, now, row["id"]),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"])
+
+    def set_total_frames(self, job_id: str, total_frames: Optional[int]) -> None:
+        self._update(job_id, total_frames=total_frames)
+
+    def heartbeat(self, job_id: str, worker: str, frames_processed: int) -> bool:
+        """Record progress; returns True when the worker should stop.
+
+        That is either a requested cancellation or the job having been
+        reassigned after this worker was presumed dead.
+        """
+        if not self._update(job_id, _OWNED, (worker,), frames_processed=frames_processed):
+            return True
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def complete(
+        self,
+        job_id: str,
+        worker: str,
+        result_dir: str | Path,
+        artifacts: Dict[str, str],
+        frames: int,
+    ) -> bool:
+        return self._update(
+            job_id,
+            _OWNED,
+            (worker,),
+            status=SUCCEEDED,
+            finished_at=time.time(),
+            frames_processed=frames,
+            result_dir=str(result_dir),
+            artifacts=json.dumps(artifacts),
+        )
+
+    def fail(self, job_id: str, worker: str, error: str) -> Optional[Job]:
+        """Requeue the job while attempts remain, otherwise mark it failed.
+
+        Returns ``None`` when ``worker`` no longer owns the job.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET "
+                "status = CASE WHEN attempts < max_attempts AND cancel_requested = 0 THEN ? ELSE ? END, "
+                "finished_at = CASE WHEN attempts < max_attempts AND cancel_requested = 0 THEN NULL ELSE ? END, "
+                "worker = NULL, error = ?, updated_at = ? "
+                f"WHERE id = ? AND {_OWNED}",
+                (QUEUED, FAILED, now, error, now, job_id, worker),
+            )
+        return self.get(job_id) if cursor.rowcount else None
+
+    def mark_cancelled(self, job_id: str, worker: str) -> bool:
+        return self._update(job_id, _OWNED, (worker,), status=CANCELLED, finished_at=time.time())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued job immediately; ask the worker to stop a running one."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, now, now, job_id, QUEUED),
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                (job_id, RUNNING),
+            )
+        return self.get(job_id)
+
+    def retry(self, job_id: str) -> Optional[Job]:
+        """Put a failed or cancelled job back on the queue with a fresh attempt budget."""
+        self._update(
+            job_id,
+            f"status IN ({', '.join('?' for _ in RETRYABLE)})",
+            RETRYABLE,
+            status=QUEUED,
+            attempts=0,
+            cancel_requested=0,
+            frames_processed=0,
+            started_at=None,
+            finished_at=None,
+            worker=None,
+            error=None,
+        )
+        return self.get(job_id)
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def count_frames(source: str | Path) -> Optional[int]:
+    path = Path(source)
+    if path.suffix.lower() in IMAGE_SUFFIXES:
+        return 1
+    if path.is_dir():
+        return sum(1 for item in path.iterdir() if item.suffix.lower() in IMAGE_SUFFIXES)
+    capture = cv2.VideoCapture(str(path))
+    try:
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        capture.release()
+    return total if total > 0 else None
+
+
+class TrackingWorker(threading.Thread):
+    """Pulls jobs from a ``JobStore`` and runs them through its own ``TrackingPipeline``.
+
+    Results land in ``<storage_dir>/<job_id>/results``: the raw ``tracks.csv``
+    plus whatever ``ReportBuilder`` emits for the rows, and a Chrome trace
+    (and cProfile dump) when the job or ``trace_mode`` asks for one.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        pipeline_factory: Callable[[], Any],
+        storage_dir: str | Path,
+        rois: Optional[Dict[str, RegionOfInterest]] = None,
+        default_camera: Optional[str] = None,
+        report_config: Optional[str] = "configs/reporting.yaml",
+        poll_interval_s: float = 1.0,
+        heartbeat_s: float = 1.0,
+        trace_mode: Optional[str] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        super().__init__(name=name or f"track-worker-{uuid.uuid4().hex[:6]}", daemon=True)
+        self.store = store
+        self.pipeline_factory = pipeline_factory
+        self.storage_dir = Path(storage_dir)
+        self.rois = rois or {}
+        self.default_camera = default_camera
+        self.report_config = report_config
+        self.poll_interval_s = poll_interval_s
+        self.heartbeat_s = heartbeat_s
+        self.trace_mode = trace_mode
+        self.logger = configure_logger("jobs")
+        self._stop_event = threading.Event()
+        self._pipeline = None
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                job = self.store.claim(self.name)
+            except sqlite3.OperationalError as exc:
+                self.logger.warning("Could not claim job: %s", exc)
+                job = None
+            if job is None:
+                self._stop_event.wait(self.poll_interval_s)
+                continue
+            with log_context(job_id=job.id, worker=self.name):
+                self.process(job)
+
+    def _keep_alive(self, job: Job, progress: Dict[str, int], lost: threading.Event, done: threading.Event) -> None:
+        # Heartbeats run beside the job so model load, frame counting and report
+        # building keep it fresh too; ``lost`` asks the job to stop at the next frame.
+        while not done.wait(self.heartbeat_s):
+            try:
+                if self.store.heartbeat(job.id, self.name, progress["frames"]):
+                    lost.set()
+            except sqlite3.OperationalError as exc:
+                self.logger.warning("Heartbeat for job %s failed: %s", job.id, exc)
+
+    def process(self, job: Job) -> None:
+        self.logger.info("%s picked up job %s (attempt %d)", self.name, job.id, job.attempts)
+        progress_state = {"frames": 0}
+        lost, done = threading.Event(), threading.Event()
+        beat = threading.Thread(
+            target=self._keep_alive,
+            args=(job, progress_state, lost, done),
+            name=f"{self.name}-heartbeat",
+            daemon=True,
+        )
+        beat.start()
+
+        def progress(processed: int) -> None:
+            progress_state["frames"] = processed
+            if lost.is_set() or self._stop_event.is_set():
+                raise JobCancelled(job.id)
+
+        try:
+            self._run_job(job, progress, progress_state)
+        finally:
+            done.set()
+            beat.join()
+
+    def _run_job(self, job: Job, progress: Callable[[int], None], progress_state: Dict[str, int]) -> None:
+        camera = job.camera or self.default_camera
+        try:
+            if self._pipeline is None:
+                self._pipeline = self.pipeline_factory()
+            self.store.set_total_frames(job.id, count_frames(job.source_path))
+            result_dir = self.storage_dir / job.id / "results"
+            tracks_csv = result_dir / "tracks.csv"
+            artifacts = {"tracks_csv": str(tracks_csv)}
+            with trace_run(
+                f"job-{job.id}",
+                result_dir,
+                mode=job.trace or self.trace_mode,
+                metadata={"job_id": job.id, "attempt": job.attempts},
+            ) as tracer:
+                rows = self._pipeline.run(
+                    job.source_path,
+                    output_csv=tracks_csv,
+                    roi=self.rois.get(camera) if camera else None,
+                    progress_fn=progress,
+                )
+                if rows and self.report_config:
+                    from src.postprocess.report_builder import ReportBuilder
+
+                    outputs = ReportBuilder(self.report_config).build(rows, output_dir=result_dir)
+                    artifacts.update({name: str(path) for name, path in outputs.items()})
+            if tracer is not None:
+                artifacts.update(tracer.outputs)
+        except JobCancelled:
+            frames = progress_state["frames"]
+            current = self.store.get(job.id)
+            if current.status != RUNNING or current.worker != self.name:
+                self.logger.warning("Job %s was reassigned while %s ran it", job.id, self.name)
+            elif self._stop_event.is_set() and not current.cancel_requested:
+                # Worker shutdown rather than a user cancel: let another worker pick it up.
+                self.store.fail(job.id, self.name, "worker shut down mid-job")
+            elif self.store.mark_cancelled(job.id, self.name):
+                self.logger.info("Job %s cancelled after %d frames", job.id, frames)
+            return
+        except Exception as exc:  # noqa: BLE001 - a failing job must not kill the worker
+            updated = self.store.fail(job.id, self.name, f"{type(exc).__name__}: {exc}")
+            if updated is None:
+                self.logger.warning("Job %s failed after being reassigned: %s", job.id, exc)
+            else:
+                self.logger.warning("Job %s failed (%s): %s", job.id, updated.status, exc)
+            return
+
+        frames = progress_state["frames"]
+        if not self.store.complete(job.id, self.name, result_dir, artifacts, frames):
+            self.logger.warning("Job %s finished on %s after being reassigned; result discarded", job.id, self.name)
+            return
+        self.logger.info("Job %s finished: %d frames, %d rows", job.id, frames, len(rows))
+
+
+def build_pipeline_factory(inference_cfg: Dict[str, Any]) -> Callable[[], Any]:
+    def factory():
+        from src.tracking.pipeline import TrackingPipeline
+
+        return TrackingPipeline(
+            detector_weights=inference_cfg["model_weights"],
+            tracker_config=inference_cfg["tracker_config"],
+            imgsz=inference_cfg["imgsz"],
+            conf=inference_cfg["conf"],
+            iou=inference_cfg["iou"],
+            device=inference_cfg["device"],
+        )
+
+    return factory
+
+
+def start_workers(
+    cfg: Dict[str, Any],
+    store: JobStore,
+    count: int,
+    rois: Optional[Dict[str, RegionOfInterest]] = None,
+    default_camera: Optional[str] = None,
+    trace_mode: Optional[str] = None,
+) -> List[TrackingWorker]:
+    """Start ``count`` tracking workers configured from the ``api.yaml`` mapping ``cfg``."""
+    jobs_cfg = cfg.get("jobs", {})
+    if trace_mode is None:
+        trace_mode = parse_trace_mode(cfg.get("tracing", {}).get("jobs"))
+    workers = [
+        TrackingWorker(
+            store,
+            build_pipeline_factory(cfg["inference"]),
+            storage_dir=jobs_cfg.get("storage_dir", "data/jobs"),
+            rois=rois,
+            default_camera=default_camera,
+            report_config=jobs_cfg.get("report_config", "configs/reporting.yaml"),
+            poll_interval_s=float(jobs_cfg.get("poll_interval_s", 1.0)),
+            heartbeat_s=float(jobs_cfg.get("heartbeat_s", 1.0)),
+            trace_mode=trace_mode,
+        )
+        for _ in range(count)
+    ]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def open_store(cfg: Dict[str, Any]) -> JobStore:
+    jobs_cfg = cfg.get("jobs", {})
+    return JobStore(
+        jobs_cfg.get("db_path", "data/jobs/jobs.sqlite"),
+        stale_after_s=float(jobs_cfg.get("stale_after_s", 300)),
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run tracking job workers without the API.")
+    parser.add_argument("--config", default="configs/api.yaml", help="API configuration file.")
+    parser.add_argument("--workers", type=int, default=None, help="Override jobs.workers.")
+    parser.add_argument(
+        "--trace",
+        choices=["trace", "profile"],
+        default=None,
+        help="Write a Chrome trace (and cProfile dump with 'profile') for every job.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cfg = load_config(args.config)
+    configure_logging(cfg.get("logging"))
+    logger = configure_logger("jobs")
+
+    rois: Dict[str, RegionOfInterest] = {}
+    default_camera: Optional[str] = None
+    if cfg["inference"].get("roi_config"):
+        rois, default_camera = load_rois(cfg["inference"]["roi_config"])
+
+    count = args.workers or int(cfg.get("jobs", {}).get("workers", 1))
+    workers = start_workers(cfg, open_store(cfg), count, rois, default_camera, trace_mode=args.trace)
+    logger.info("Started %d tracking workers", count)
+
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+    stopping.wait()
+    logger.info("Stopping workers; running jobs will be requeued")
+    for worker in workers:
+        worker.stop()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
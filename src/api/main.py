@@ -1,20 +1,36 @@
 from __future__ import annotations
 
+import itertools
+import re
+import shutil
+import tarfile
 import tempfile
+import uuid
+import zipfile
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List, Optional
 
-from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse
 
+from src.api.batch import METADATA_NAME, DecodedImage, batched, decode_image, iter_archive, parse_metadata
+from src.api.jobs import RETRYABLE, STATUSES, SUCCEEDED, JobStore, TrackingWorker, new_job_id, open_store, start_workers
 from src.config import load_config
 from src.detection.predictor import Detector
+from src.detection.roi import RegionOfInterest, load_rois
 from src.tracking.pipeline import TrackingPipeline
-from src.utils.logger import configure_logger
+from src.utils.logger import configure_logger, configure_logging, log_context
+from src.utils.tracing import parse_trace_mode, trace_run
 
 app = FastAPI(title="Nivaro Civic Issue Detection API")
-logger = configure_logger("api")
 cfg = load_config("configs/api.yaml")
+configure_logging(cfg.get("logging"))
+logger = configure_logger("api")
+
+rois: Dict[str, RegionOfInterest] = {}
+default_camera: Optional[str] = None
+if cfg["inference"].get("roi_config"):
+    rois, default_camera = load_rois(cfg["inference"]["roi_config"])
 
 detector = Detector(
     weights=cfg["inference"]["model_weights"],
@@ -22,6 +38,7 @@ detector = Detector(
     conf=cfg["inference"]["conf"],
     iou=cfg["inference"]["iou"],
     device=cfg["inference"]["device"],
+    roi=rois.get(default_camera),
 )
 tracker = TrackingPipeline(
     detector_weights=cfg["inference"]["model_weights"],
@@ -30,14 +47,77 @@ tracker = TrackingPipeline(
     conf=cfg["inference"]["conf"],
     iou=cfg["inference"]["iou"],
     device=cfg["inference"]["device"],
+    roi=rois.get(default_camera),
 )
 
+jobs_cfg = cfg.get("jobs", {})
+tracing_cfg = cfg.get("tracing", {})
+TRACE_HEADER = tracing_cfg.get("header", "X-Nivaro-Trace")
+# Client request IDs end up in log lines and trace file names, so only simple tokens are kept.
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+job_store: JobStore = open_store(cfg)
+job_workers: List[TrackingWorker] = []
+
+
+@app.on_event("startup")
+def start_job_workers() -> None:
+    # Set jobs.embedded_workers to 0 and run `python -m src.api.jobs` to scale workers separately.
+    count = int(jobs_cfg.get("embedded_workers", 1))
+    if count > 0:
+        job_workers.extend(start_workers(cfg, job_store, count, rois, default_camera))
+        logger.info("Started %d embedded tracking workers", count)
+
+
+@app.on_event("shutdown")
+def stop_job_workers() -> None:
+    for worker in job_workers:
+        worker.stop()
+    for worker in job_workers:
+        worker.join()
+
+
+def _requested_trace(request: Request) -> Optional[str]:
+    if not tracing_cfg.get("allow_header", False):
+        return None
+    return parse_trace_mode(request.headers.get(TRACE_HEADER))
+
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID", "")
+    if not REQUEST_ID_PATTERN.fullmatch(request_id):
+        request_id = uuid.uuid4().hex
+    # Job submissions carry the trace flag to the worker instead of tracing the upload.
+    # cProfile only sees the event-loop thread, so "profile" suits the async endpoints.
+    trace_mode = None if request.url.path.startswith("/jobs") else _requested_trace(request)
+    with log_context(request_id=request_id), trace_run(
+        f"request-{request_id}",
+        tracing_cfg.get("output_dir", "reports/traces"),
+        mode=trace_mode,
+        metadata={"path": request.url.path},
+        keep_last=int(tracing_cfg.get("keep_last", 200)),
+    ) as tracer:
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    if tracer is not None:
+        # Hand back the run name only; the file stays under tracing.output_dir on the server.
+        response.headers[f"{TRACE_HEADER}-Id"] = tracer.name
+    return response
+
 
 @app.get("/health")
 async def healthcheck() -> dict:
     return {"status": "ok"}
 
 
+def _camera_roi(camera: Optional[str]) -> Optional[RegionOfInterest]:
+    if camera is None:
+        return None
+    if camera not in rois:
+        raise HTTPException(status_code=404, detail=f"No ROI configured for camera '{camera}'")
+    return rois[camera]
+
+
 def _format_detection(results) -> List[dict]:
     formatted: List[dict] = []
     for result in results:
@@ -64,24 +144,168 @@ def _format_detection(results) -> List[dict]:
 
 
 @app.post("/detect")
-async def detect_endpoint(file: UploadFile = File(...)) -> JSONResponse:
+async def detect_endpoint(file: UploadFile = File(...), camera: Optional[str] = None) -> JSONResponse:
+    roi = _camera_roi(camera)
     with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp:
         tmp.write(await file.read())
         tmp_path = Path(tmp.name)
 
-    results = detector.predict(tmp_path)
+    results = detector.predict(tmp_path, roi=roi)
     formatted = _format_detection(results)
     tmp_path.unlink(missing_ok=True)
     return JSONResponse({"detections": formatted})
 
 
 @app.post("/track")
-async def track_endpoint(file: UploadFile = File(...)) -> JSONResponse:
+async def track_endpoint(file: UploadFile = File(...), camera: Optional[str] = None) -> JSONResponse:
+    roi = _camera_roi(camera)
     with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp:
         tmp.write(await file.read())
         tmp_path = Path(tmp.name)
 
-    rows = tracker.run(str(tmp_path))
+    rows = tracker.run(str(tmp_path), roi=roi)
     tmp_path.unlink(missing_ok=True)
     return JSONResponse({"tracks": rows})
 
+
+@app.post("/detect/batch")
+def detect_batch_endpoint(
+    files: List[UploadFile] = File(default=[]),
+    archive: Optional[UploadFile] = File(default=None),
+    metadata: Optional[str] = Form(default=None),
+    camera: Optional[str] = None,
+) -> JSONResponse:
+    """Detect on many frames at once from multipart files and/or a zip/tar archive.
+
+    ``metadata`` is an optional JSON object mapping filename to extra fields
+    (e.g. timestamp, lat, lon); an archive may carry the same as ``metadata.json``.
+    Image names must be unique across parts and archive members.
+    """
+    roi = _camera_roi(camera)
+    batch_cfg = cfg.get("batch", {})
+    max_batch_size = int(batch_cfg.get("max_batch_size", 16))
+    max_images = int(batch_cfg.get("max_images", 1000))
+
+    try:
+        per_image_meta: Dict[str, Dict] = parse_metadata(metadata) if metadata else {}
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=f"Invalid metadata: {exc}") from exc
+
+    def uploads() -> Iterator[DecodedImage]:
+        for upload in files:
+            yield upload.filename, decode_image(upload.file.read())
+        if archive is not None:
+            try:
+                yield from iter_archive(archive.file, archive.filename or "", per_image_meta)
+            except (zipfile.BadZipFile, tarfile.TarError) as exc:
+                raise HTTPException(status_code=422, detail=f"Unreadable archive: {exc}") from exc
+            except ValueError as exc:
+                raise HTTPException(status_code=422, detail=f"Invalid {METADATA_NAME}: {exc}") from exc
+
+    results: Dict[str, Dict] = {}
+    received = 0
+    images = itertools.islice(uploads(), max_images + 1)
+    for batch in batched(images, max_batch_size):
+        received += len(batch)
+        if received > max_images:
+            raise HTTPException(status_code=413, detail=f"At most {max_images} images per request")
+        names = [name for name, _ in batch]
+        duplicates = sorted({name for name in names if name in results or names.count(name) > 1})
+        if duplicates:
+            # Results are keyed by filename, so a repeated name would silently replace a result.
+            raise HTTPException(status_code=422, detail=f"Duplicate image names: {', '.join(duplicates)}")
+        decoded = [(name, image) for name, image in batch if image is not None]
+        for name, image in batch:
+            if image is None:
+                results[name] = {"error": "could not decode image"}
+        outputs = detector.predict_batch(
+            [image for _, image in decoded],
+            roi=roi,
+            batch_size=max_batch_size,
+        )
+        for (name, _), output in zip(decoded, outputs):
+            results[name] = {"detections": _format_detection(output)}
+
+    if not results:
+        raise HTTPException(status_code=422, detail="No images supplied")
+    for name, extra in per_image_meta.items():
+        if name in results:
+            results[name]["metadata"] = extra
+    logger.info("Batch detect processed %d images", len(results))
+    return JSONResponse({"count": len(results), "results": results})
+
+
+def _get_job(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return job
+
+
+@app.post("/jobs/track", status_code=202)
+def submit_track_job(
+    request: Request,
+    file: UploadFile = File(...),
+    camera: Optional[str] = None,
+) -> JSONResponse:
+    """Queue a video for background tracking; poll ``/jobs/{id}`` for progress."""
+    _camera_roi(camera)
+    job_id = new_job_id()
+    job_dir = Path(jobs_cfg.get("storage_dir", "data/jobs")) / job_id
+    job_dir.mkdir(parents=True, exist_ok=True)
+    source_path = job_dir / f"input{Path(file.filename or '').suffix}"
+    with source_path.open("wb") as handle:
+        shutil.copyfileobj(file.file, handle, length=1 << 20)
+
+    job = job_store.submit(
+        source_path,
+        camera=camera,
+        max_attempts=int(jobs_cfg.get("max_attempts", 3)),
+        job_id=job_id,
+        trace=_requested_trace(request),
+    )
+    logger.info("Queued tracking job %s (%s)", job.id, file.filename)
+    return JSONResponse(job.to_dict(), status_code=202)
+
+
+@app.get("/jobs")
+def list_jobs(status: Optional[str] = None, limit: int = 50) -> JSONResponse:
+    """Most recent jobs first, optionally only those in ``status``."""
+    if status is not None and status not in STATUSES:
+        raise HTTPException(status_code=422, detail=f"Unknown status '{status}', expected one of {', '.join(STATUSES)}")
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=422, detail="limit must be between 1 and 500")
+    return JSONResponse({"jobs": [job.to_dict() for job in job_store.list(status=status, limit=limit)]})
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str) -> JSONResponse:
+    return JSONResponse(_get_job(job_id).to_dict())
+
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str, artifact: Optional[str] = None):
+    """Return the artifact listing, or stream one artifact with ``?artifact=<name>``."""
+    job = _get_job(job_id)
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    if artifact is None:
+        return JSONResponse({"id": job.id, "artifacts": sorted(job.artifacts)})
+    if artifact not in job.artifacts or not Path(job.artifacts[artifact]).exists():
+        raise HTTPException(status_code=404, detail=f"No artifact '{artifact}' for job {job.id}")
+    path = Path(job.artifacts[artifact])
+    return FileResponse(path, filename=path.name)
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str) -> JSONResponse:
+    _get_job(job_id)
+    return JSONResponse(job_store.cancel(job_id).to_dict())
+
+
+@app.post("/jobs/{job_id}/retry")
+def retry_job(job_id: str) -> JSONResponse:
+    job = _get_job(job_id)
+    if job.status not in RETRYABLE:
+        raise HTTPException(status_code=409, detail=f"Only failed or cancelled jobs can be retried, job is {job.status}")
+    return JSONResponse(job_store.retry(job_id).to_dict())
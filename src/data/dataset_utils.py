@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, Iterable, List, Sequence, Tuple
@@ -28,6 +29,31 @@ def list_image_files(path: Path) -> List[Path]:
     return sorted([p for p in path.glob("*") if p.suffix.lower() in exts])
 
 
+def list_dataset_images(
+    dataset_root: Path,
+    classes: Sequence[str],
+    splits: Sequence[str],
+    image_subdir: str,
+) -> List[Tuple[str, str, Path]]:
+    """Return ``(class_name, split, image_path)`` for every image in the class-wise layout."""
+    records: List[Tuple[str, str, Path]] = []
+    for cls in classes:
+        for split in splits:
+            image_dir = dataset_root / cls / split / image_subdir
+            if not image_dir.exists():
+                continue
+            records.extend((cls, split, path) for path in list_image_files(image_dir))
+    return records
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def expected_label_path(image_path: Path, label_dir: Path) -> Path:
     return label_dir / f"{image_path.stem}.txt"
 
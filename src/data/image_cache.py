@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.data.dataset_utils import file_digest, list_image_files
+from src.utils.logger import configure_logger
+
+CACHE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+PAD_VALUE = 114
+
+CachedImage = Tuple[np.ndarray, Tuple[int, int], Tuple[int, int]]
+
+
+@dataclass
+class CacheEntry:
+    source: str
+    digest: str
+    shard: int
+    index: int
+    orig_hw: Tuple[int, int]
+    resized_hw: Tuple[int, int]
+    pad: Tuple[int, int]
+    size: int
+    mtime_ns: int
+
+
+def cache_dir_for(cache_root: str | Path, image_dir: str | Path) -> Path:
+    """Cache directory for a split, e.g. ``<root>/train`` for ``.../train/images``."""
+    return Path(cache_root) / Path(image_dir).parent.name
+
+
+def letterbox(image: np.ndarray, imgsz: int) -> Tuple[np.ndarray, Tuple[int, int], Tuple[int, int]]:
+    """Resize the long side to ``imgsz`` and centre the result on a square canvas.
+
+    Sizing and interpolation match Ultralytics' ``BaseDataset.load_image`` so cached
+    and freshly decoded images are pixel-identical.
+    """
+    h0, w0 = image.shape[:2]
+    ratio = imgsz / max(h0, w0)
+    h, w = min(math.ceil(h0 * ratio), imgsz), min(math.ceil(w0 * ratio), imgsz)
+    if (h, w) != (h0, w0):
+        image = cv2.resize(image, (w, h), interpolation=cv2.INTER_LINEAR)
+    top, left = (imgsz - h) // 2, (imgsz - w) // 2
+    canvas = np.full((imgsz, imgsz, 3), PAD_VALUE, dtype=np.uint8)
+    canvas[top : top + h, left : left + w] = image
+    return canvas, (h, w), (top, left)
+
+
+def _read_manifest(cache_dir: Path) -> Optional[Dict]:
+    path = cache_dir / MANIFEST_NAME
+    if not path.exists():
+        return None
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    if manifest.get("version") != CACHE_VERSION:
+        return None
+    return manifest
+
+
+def _shard_path(cache_dir: Path, shard: int) -> Path:
+    return cache_dir / f"shard_{shard:05d}.npy"
+
+
+def build_image_cache(
+    image_dir: str | Path,
+    cache_dir: str | Path,
+    imgsz: int,
+    shard_size: int = 256,
+    workers: int = 8,
+) -> Dict:
+    """Decode every image once into letterboxed ``uint8`` shards.
+
+    Entries whose source hash is unchanged are copied from the previous build,
+    so only new or edited images are decoded again. Files whose size and mtime
+    match the previous manifest keep their recorded hash instead of being read.
+    A different ``imgsz`` invalidates the whole split.
+    """
+    logger = configure_logger("image_cache")
+    image_dir = Path(image_dir)
+    cache_dir = Path(cache_dir)
+    images = list_image_files(image_dir)
+
+    previous = _read_manifest(cache_dir)
+    if previous is not None and previous.get("imgsz") != imgsz:
+        logger.info("imgsz changed (%s -> %s); rebuilding %s", previous.get("imgsz"), imgsz, cache_dir)
+        previous = None
+    known = {entry["source"]: entry for entry in previous["entries"]} if previous is not None else {}
+
+    def digest_of(path: Path) -> str:
+        entry = known.get(str(path.resolve()))
+        stat = path.stat()
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["digest"]
+        return file_digest(path)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        digests = list(pool.map(digest_of, images))
+
+    if previous is not None:
+        sources = [(str(path.resolve()), digest) for path, digest in zip(images, digests)]
+        cached = [(entry["source"], entry["digest"]) for entry in previous["entries"]]
+        if sources == cached:
+            # Content is unchanged, but ``ImageCache.lookup`` also checks size/mtime,
+            # so refresh them (e.g. after a touch or re-copy) or every lookup would miss.
+            refreshed = False
+            for path, entry in zip(images, previous["entries"]):
+                stat = path.stat()
+                if entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+                    entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+                    refreshed = True
+            if refreshed:
+                manifest_path = cache_dir / MANIFEST_NAME
+                tmp = manifest_path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(previous), encoding="utf-8")
+                os.replace(tmp, manifest_path)
+            logger.info(
+                "Image cache up to date -> %s (%d images%s)",
+                cache_dir,
+                len(images),
+                ", refreshed file stats" if refreshed else "",
+            )
+            return previous
+
+    reusable: Dict[str, Dict] = {}
+    if previous is not None:
+        reusable = {entry["digest"]: entry for entry in previous["entries"]}
+    old_shards: Dict[int, np.ndarray] = {}
+
+    def load_previous(entry: Dict) -> np.ndarray:
+        shard = entry["shard"]
+        if shard not in old_shards:
+            old_shards[shard] = np.load(_shard_path(cache_dir, shard), mmap_mode="r")
+        return old_shards[shard][entry["index"]]
+
+    def decode(item: Tuple[Path, str]) -> Optional[Tuple[np.ndarray, Tuple[int, int], Tuple[int, int], Tuple[int, int]]]:
+        path, digest = item
+        if digest in reusable:
+            entry = reusable[digest]
+            return load_previous(entry), tuple(entry["orig_hw"]), tuple(entry["resized_hw"]), tuple(entry["pad"])
+        image = cv2.imread(str(path))
+        if image is None:
+            return None
+        canvas, resized_hw, pad = letterbox(image, imgsz)
+        return canvas, image.shape[:2], resized_hw, pad
+
+    staging = cache_dir.with_name(f"{cache_dir.name}.building")
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    entries: List[CacheEntry] = []
+    reused = 0
+    items = list(zip(images, digests))
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for shard, start in enumerate(range(0, len(items), shard_size)):
+            chunk = items[start : start + shard_size]
+            decoded = list(pool.map(decode, chunk))
+            valid = [(item, out) for item, out in zip(chunk, decoded) if out is not None]
+            for (path, _), out in zip(chunk, decoded):
+                if out is None:
+                    logger.warning("Unreadable image skipped: %s", path)
+            if not valid:
+                continue
+            array = np.lib.format.open_memmap(
+                _shard_path(staging, shard),
+                mode="w+",
+                dtype=np.uint8,
+                shape=(len(valid), imgsz, imgsz, 3),
+            )
+            for index, ((path, digest), (canvas, orig_hw, resized_hw, pad)) in enumerate(valid):
+                array[index] = canvas
+                reused += digest in reusable
+                stat = path.stat()
+                entries.append(
+                    CacheEntry(
+                        source=str(path.resolve()),
+                        digest=digest,
+                        shard=shard,
+                        index=index,
+                        orig_hw=tuple(orig_hw),
+                        resized_hw=tuple(resized_hw),
+                        pad=tuple(pad),
+                        size=stat.st_size,
+                        mtime_ns=stat.st_mtime_ns,
+                    )
+                )
+            array.flush()
+            del array
+
+    manifest = {
+        "version": CACHE_VERSION,
+        "imgsz": imgsz,
+        "shard_size": shard_size,
+        "image_dir": str(image_dir.resolve()),
+        "entries": [asdict(entry) for entry in entries],
+    }
+    (staging / MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+
+    old_shards.clear()
+    if cache_dir.exists():
+        shutil.rmtree(cache_dir)
+    staging.rename(cache_dir)
+    logger.info(
+        "Built image cache -> %s (images=%d, reused=%d, decoded=%d)",
+        cache_dir,
+        len(entries),
+        reused,
+        len(entries) - reused,
+    )
+    return manifest
+
+
+class ImageCache:
+    """Read-only view over letterboxed shards produced by ``build_image_cache``."""
+
+    def __init__(self, cache_dir: str | Path, imgsz: int) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.imgsz = imgsz
+        self.entries: Dict[str, CacheEntry] = {}
+        self._shards: Dict[int, np.ndarray] = {}
+
+        logger = configure_logger("image_cache")
+        manifest = _read_manifest(self.cache_dir)
+        if manifest is None:
+            logger.warning("No image cache at %s; images will be decoded on the fly.", self.cache_dir)
+            return
+        if manifest.get("imgsz") != imgsz:
+            logger.warning(
+                "Image cache %s was built for imgsz=%s, not %s; ignoring it.",
+                self.cache_dir,
+                manifest.get("imgsz"),
+                imgsz,
+            )
+            return
+        for raw in manifest["entries"]:
+            entry = CacheEntry(**raw)
+            self.entries[entry.source] = entry
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getstate__(self) -> Dict:
+        # Memory maps are reopened lazily in each dataloader worker.
+        state = self.__dict__.copy()
+        state["_shards"] = {}
+        return state
+
+    def lookup(self, source: str | Path) -> Optional[CacheEntry]:
+        entry = self.entries.get(str(Path(source).resolve()))
+        if entry is None:
+            return None
+        try:
+            stat = Path(entry.source).stat()
+        except FileNotFoundError:
+            return None
+        if stat.st_size != entry.size or stat.st_mtime_ns != entry.mtime_ns:
+            return None
+        return entry
+
+    def _shard(self, shard: int) -> np.ndarray:
+        if shard not in self._shards:
+            self._shards[shard] = np.load(_shard_path(self.cache_dir, shard), mmap_mode="r")
+        return self._shards[shard]
+
+    def load(self, source: str | Path) -> Optional[CachedImage]:
+        """Return ``(image, orig_hw, resized_hw)`` with the letterbox padding removed."""
+        entry = self.lookup(source)
+        if entry is None:
+            return None
+        (h, w), (top, left) = entry.resized_hw, entry.pad
+        canvas = self._shard(entry.shard)[entry.index]
+        image = np.array(canvas[top : top + h, left : left + w])
+        return image, tuple(entry.orig_hw), (h, w)
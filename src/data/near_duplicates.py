@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.utils.logger import configure_logger
+
+HASH_BITS = 64
+
+
+def dhash(path: str | Path) -> Optional[int]:
+    """64-bit difference hash; robust to re-encoding, small shifts and exposure changes."""
+    image = cv2.imread(str(path), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if image is None:
+        return None
+    small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+_POPCOUNT_TABLE = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    xor = np.asarray(np.bitwise_xor(a, b), dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(xor)
+    counts = _POPCOUNT_TABLE[np.ascontiguousarray(xor).reshape(-1).view(np.uint8)]
+    return counts.reshape(xor.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def _band_layout(max_distance: int) -> List[Tuple[int, int]]:
+    """Split the hash into ``max_distance + 1`` bands of ``(shift, width)`` bits.
+
+    By the pigeonhole principle two hashes within ``max_distance`` bits agree
+    exactly on at least one band, so bucketing per band finds every neighbour
+    without comparing all pairs.
+    """
+    bands = max_distance + 1
+    if not 0 < bands <= HASH_BITS:
+        raise ValueError(f"max_distance must be in [0, {HASH_BITS - 1}], got {max_distance}")
+    base, extra = divmod(HASH_BITS, bands)
+    layout: List[Tuple[int, int]] = []
+    shift = 0
+    for band in range(bands):
+        width = base + (1 if band < extra else 0)
+        layout.append((shift, width))
+        shift += width
+    return layout
+
+
+def _band_values(hashes: np.ndarray, shift: int, width: int) -> np.ndarray:
+    mask = np.uint64((1 << width) - 1)
+    return (hashes >> np.uint64(shift)) & mask
+
+
+class _UnionFind:
+    def __init__(self, size: int) -> None:
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+class PerceptualHashIndex:
+    """Multi-index hash table over 64-bit dHashes for Hamming-radius search."""
+
+    def __init__(self, paths: Sequence[Path], hashes: np.ndarray) -> None:
+        self.paths = list(paths)
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self._tables: Dict[int, List[Dict[int, np.ndarray]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @classmethod
+    def build(
+        cls,
+        paths: Iterable[Path],
+        workers: int = 8,
+        cache_path: Optional[str | Path] = None,
+    ) -> "PerceptualHashIndex":
+        """Hash ``paths`` in parallel, reusing entries from ``cache_path`` when size/mtime match."""
+        logger = configure_logger("near_duplicates")
+        paths = list(paths)
+        cache: Dict[str, List] = {}
+        cache_file = Path(cache_path) if cache_path else None
+        if cache_file and cache_file.exists():
+            cache = json.loads(cache_file.read_text(encoding="utf-8"))
+
+        def hash_one(path: Path) -> Tuple[str, Optional[List]]:
+            key = str(path.resolve())
+            stat = path.stat()
+            cached = cache.get(key)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                return key, cached
+            value = dhash(path)
+            if value is None:
+                return key, None
+            return key, [stat.st_size, stat.st_mtime_ns, f"{value:016x}"]
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(hash_one, paths))
+
+        kept: List[Path] = []
+        values: List[int] = []
+        fresh: Dict[str, List] = {}
+        for path, (key, entry) in zip(paths, results):
+            if entry is None:
+                logger.warning("Unreadable image skipped: %s", path)
+                continue
+            fresh[key] = entry
+            kept.append(path)
+            values.append(int(entry[2], 16))
+
+        if cache_file:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            cache_file.write_text(json.dumps(fresh), encoding="utf-8")
+        return cls(kept, np.array(values, dtype=np.uint64))
+
+    def _tables_for(self, max_distance: int) -> List[Dict[int, np.ndarray]]:
+        if max_distance not in self._tables:
+            tables: List[Dict[int, np.ndarray]] = []
+            for shift, width in _band_layout(max_distance):
+                keys = _band_values(self.hashes, shift, width)
+                order = np.argsort(keys, kind="stable")
+                uniques, starts = np.unique(keys[order], return_index=True)
+                buckets = np.split(order, starts[1:])
+                tables.append({int(key): bucket for key, bucket in zip(uniques, buckets)})
+            self._tables[max_distance] = tables
+        return self._tables[max_distance]
+
+    def query(self, value: int, max_distance: int) -> List[Tuple[int, int]]:
+        """Return ``(index, distance)`` for every stored hash within ``max_distance`` of ``value``."""
+        probe = np.uint64(value)
+        candidates: List[np.ndarray] = []
+        for (shift, width), table in zip(_band_layout(max_distance), self._tables_for(max_distance)):
+            bucket = table.get(int(_band_values(probe, shift, width)))
+            if bucket is not None:
+                candidates.append(bucket)
+        if not candidates:
+            return []
+        indices = np.unique(np.concatenate(candidates))
+        distances = hamming(self.hashes[indices], probe)
+        hits = distances <= max_distance
+        return [(int(i), int(d)) for i, d in zip(indices[hits], distances[hits])]
+
+    def pairs(self, max_distance: int, chunk: int = 1024) -> Iterable[Tuple[int, int]]:
+        """Yield index pairs ``(i, j)`` with ``i < j`` within ``max_distance`` bits.
+
+        Pairs that collide in several bands may be yielded more than once.
+        """
+        for table in self._tables_for(max_distance):
+            for bucket in table.values():
+                if len(bucket) < 2:
+                    continue
+                bucket_hashes = self.hashes[bucket]
+                for start in range(0, len(bucket), chunk):
+                    rows = bucket[start : start + chunk]
+                    distances = hamming(bucket_hashes[start : start + chunk, None], bucket_hashes[None, :])
+                    row_idx, col_idx = np.nonzero(distances <= max_distance)
+                    for a, b in zip(rows[row_idx], bucket[col_idx]):
+                        if a < b:
+                            yield int(a), int(b)
+
+    def clusters(self, max_distance: int) -> List[List[int]]:
+        """Group images connected by near-duplicate links; singletons are omitted.
+
+        Links are transitive, so a slowly changing video can chain into one
+        large cluster; use ``assign_leaders`` to decide which images to drop.
+        """
+        union_find = _UnionFind(len(self))
+        for a, b in self.pairs(max_distance):
+            union_find.union(a, b)
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for index in range(len(self)):
+            groups[union_find.find(index)].append(index)
+        return [members for members in groups.values() if len(members) > 1]
+
+    def assign_leaders(self, ordered: Sequence[int], max_distance: int) -> Dict[int, int]:
+        """Greedy leader clustering over ``ordered`` (most preferred first).
+
+        Each image not yet covered becomes a leader and claims every uncovered
+        image within ``max_distance`` of *itself*, so a dropped image is always
+        a near-copy of the one kept. Returns ``index -> leader index``.
+        """
+        members = set(ordered)
+        leaders: Dict[int, int] = {}
+        for index in ordered:
+            if index in leaders:
+                continue
+            leaders[index] = index
+            for other, _ in self.query(int(self.hashes[index]), max_distance):
+                if other in members and other not in leaders:
+                    leaders[other] = index
+        return leaders
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from src.utils.logger import configure_logger
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+# Backends whose intra-op thread count the benchmark can actually pin; others run
+# with their own default and are benchmarked once with ``threads=0``.
+THREADED_BACKENDS = {"pytorch", "pt", "onnx"}
+
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    backend: str
+    imgsz: int
+    batch: int
+    threads: int
+
+    @property
+    def key(self) -> str:
+        key = f"{self.backend}/imgsz{self.imgsz}/b{self.batch}"
+        return f"{key}/t{self.threads}" if self.threads else key
+
+
+def expand_cases(
+    backends: Sequence[str],
+    imgszs: Sequence[int],
+    batches: Sequence[int],
+    threads: Sequence[int],
+) -> List[BenchmarkCase]:
+    cases: List[BenchmarkCase] = []
+    for backend, imgsz, batch in itertools.product(backends, imgszs, batches):
+        for thread in threads if backend in THREADED_BACKENDS else [0]:
+            cases.append(BenchmarkCase(backend, int(imgsz), int(batch), int(thread)))
+    return cases
+
+
+def percentile_summary(latencies_ms: Sequence[float]) -> Dict[str, float]:
+    values = np.asarray(latencies_ms, dtype=np.float64)
+    return {
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "mean": float(values.mean()),
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def prepare_model(weights: str | Path, backend: str, imgsz: int, batch: int, work_dir: Path) -> str:
+    """Return a model path for ``backend``, exporting a static-shape copy when needed."""
+    if backend in {"pytorch", "pt"}:
+        return str(weights)
+
+    from ultralytics import YOLO
+
+    # Exports are written next to the weights, so give every shape its own copy.
+    work_dir.mkdir(parents=True, exist_ok=True)
+    staged = work_dir / f"{Path(weights).stem}_{backend}_{imgsz}_b{batch}.pt"
+    if not staged.exists():
+        shutil.copy2(weights, staged)
+    return str(YOLO(str(staged)).export(format=backend, imgsz=imgsz, batch=batch))
+
+
+@contextmanager
+def _thread_env(threads: int) -> Iterator[None]:
+    """Set BLAS/OpenMP thread variables while child processes are spawned.
+
+    They are only read when those libraries load, so they must be in the
+    child's environment before it imports numpy or torch.
+    """
+    if not threads:
+        yield
+        return
+    previous = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    os.environ.update({name: str(threads) for name in THREAD_ENV_VARS})
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _pin_backend_threads(model, backend: str, model_path: str, threads: int) -> None:
+    if not threads:
+        return
+    if backend in {"pytorch", "pt"}:
+        import torch
+
+        torch.set_num_threads(threads)
+    elif backend == "onnx":
+        # onnxruntime sizes its own pool and ignores torch/OpenMP settings, so
+        # rebuild the session Ultralytics created with an explicit thread count.
+        import onnxruntime
+
+        autobackend = model.predictor.model
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        autobackend.session = onnxruntime.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=autobackend.session.get_providers(),
+        )
+
+
+def measure_latency(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Time repeated forward passes for one case; runs in a fresh process."""
+    import cv2
+    from ultralytics import YOLO
+
+    model = YOLO(job["model_path"], task="detect")
+    images = [cv2.imread(path) for path in job["images"]]
+    batch = job["batch"]
+    batches = [
+        [images[(start + offset) % len(images)] for offset in range(batch)]
+        for start in range(0, max(len(images), batch), batch)
+    ]
+
+    def forward(index: int) -> None:
+        model.predict(
+            batches[index % len(batches)],
+            imgsz=job["imgsz"],
+            device=job["device"],
+            verbose=False,
+        )
+
+    # The first call builds the predictor, whose backend session is then re-pinned.
+    forward(0)
+    _pin_backend_threads(model, job["backend"], job["model_path"], job["threads"])
+    for index in range(job["warmup"]):
+        forward(index)
+
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for index in range(job["iterations"]):
+        tick = time.perf_counter()
+        forward(index)
+        latencies.append((time.perf_counter() - tick) * 1000.0)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "latency_ms": percentile_summary(latencies),
+        "images_per_sec": job["iterations"] * batch / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def measure_accuracy(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Run ``model.val`` and return overall and per-class mAP50."""
+    from ultralytics import YOLO
+
+    model = YOLO(job["model_path"], task="detect")
+    metrics = model.val(
+        data=job["data_config"],
+        imgsz=job["imgsz"],
+        batch=1,
+        split=job["split"],
+        device=job["device"],
+        plots=False,
+        verbose=False,
+    )
+    per_class = {
+        metrics.names[int(cls_id)]: float(ap50)
+        for cls_id, ap50 in zip(metrics.ap_class_index, metrics.box.ap50)
+    }
+    return {"map50": float(metrics.box.map50), "per_class_map50": per_class}
+
+
+def _run_isolated(fn, job: Dict[str, Any], threads: int = 0) -> Dict[str, Any]:
+    # A fresh interpreter per measurement keeps thread settings and peak RSS independent.
+    context = multiprocessing.get_context("spawn")
+    with _thread_env(threads):
+        pool = context.Pool(processes=1)
+    with pool:
+        return pool.apply(fn, (job,))
+
+
+def run_benchmark(
+    weights: str | Path,
+    cases: Sequence[BenchmarkCase],
+    images: Sequence[str | Path],
+    data_config: Optional[str | Path] = None,
+    split: str = "val",
+    device: str | int = "cpu",
+    warmup: int = 3,
+    iterations: int = 30,
+    work_dir: str | Path = "experiments/benchmark",
+) -> Dict[str, Any]:
+    logger = configure_logger("benchmark")
+    work_dir = Path(work_dir)
+    accuracy: Dict[tuple, Dict[str, Any]] = {}
+    results: List[Dict[str, Any]] = []
+
+    for case in cases:
+        model_path = prepare_model(weights, case.backend, case.imgsz, case.batch, work_dir)
+        timing = _run_isolated(
+            measure_latency,
+            {
+                "model_path": model_path,
+                "backend": case.backend,
+                "images": [str(path) for path in images],
+                "imgsz": case.imgsz,
+                "batch": case.batch,
+                "threads": case.threads,
+                "device": device,
+                "warmup": warmup,
+                "iterations": iterations,
+            },
+            threads=case.threads,
+        )
+        accuracy_key = (case.backend, case.imgsz)
+        if data_config and accuracy_key not in accuracy:
+            accuracy[accuracy_key] = _run_isolated(
+                measure_accuracy,
+                {
+                    "model_path": prepare_model(weights, case.backend, case.imgsz, 1, work_dir),
+                    "data_config": str(data_config),
+                    "imgsz": case.imgsz,
+                    "split": split,
+                    "device": device,
+                },
+            )
+        entry = {"key": case.key, **asdict(case), **timing, **accuracy.get(accuracy_key, {})}
+        results.append(entry)
+        logger.info(
+            "%s: p50=%.1fms p95=%.1fms p99=%.1fms %.1f img/s rss=%sMB mAP50=%s",
+            case.key,
+            timing["latency_ms"]["p50"],
+            timing["latency_ms"]["p95"],
+            timing["latency_ms"]["p99"],
+            timing["images_per_sec"],
+            f"{timing['peak_rss_mb']:.0f}" if timing["peak_rss_mb"] is not None else "n/a",
+            f"{entry['map50']:.4f}" if "map50" in entry else "n/a",
+        )
+
+    return {
+        "weights": str(weights),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+        },
+        "settings": {"device": device, "warmup": warmup, "iterations": iterations, "images": len(images)},
+        "results": results,
+    }
+
+
+def compare_to_baseline(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    latency_metric: str = "p95",
+    max_latency_regression: float = 0.10,
+    max_map50_drop: float = 0.01,
+) -> List[str]:
+    """Return human-readable regressions of ``report`` against ``baseline``.
+
+    A case without a baseline entry counts as a failure too, so a renamed or
+    newly added case cannot pass the gate without ever being compared.
+    """
+    previous = {entry["key"]: entry for entry in baseline.get("results", [])}
+    regressions: List[str] = []
+    if not report["results"]:
+        regressions.append("no benchmark cases were run, nothing to compare")
+    for entry in report["results"]:
+        before = previous.get(entry["key"])
+        if before is None:
+            regressions.append(f"{entry['key']}: no baseline entry (rerun with --update-baseline)")
+            continue
+        old_latency = before["latency_ms"][latency_metric]
+        new_latency = entry["latency_ms"][latency_metric]
+        if new_latency > old_latency * (1 + max_latency_regression):
+            regressions.append(
+                f"{entry['key']}: {latency_metric} latency {old_latency:.1f}ms -> {new_latency:.1f}ms"
+            )
+        if "map50" in entry and "map50" in before and before["map50"] - entry["map50"] > max_map50_drop:
+            regressions.append(f"{entry['key']}: mAP50 {before['map50']:.4f} -> {entry['map50']:.4f}")
+        for name, old_ap in before.get("per_class_map50", {}).items():
+            new_ap = entry.get("per_class_map50", {}).get(name)
+            if new_ap is not None and old_ap - new_ap > max_map50_drop:
+                regressions.append(f"{entry['key']}: {name} mAP50 {old_ap:.4f} -> {new_ap:.4f}")
+    return regressions
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
+import cv2
+import numpy as np
 from ultralytics import YOLO
 
+from src.detection.roi import RegionOfInterest
 from src.utils.logger import configure_logger
+from src.utils.tracing import span, traced_iter
+from src.utils.video import iter_frames
 
 
 class Detector:
@@ -16,27 +21,91 @@ class Detector:
         conf: float = 0.25,
         iou: float = 0.45,
         device: str | int = "cpu",
+        roi: Optional[RegionOfInterest] = None,
     ) -> None:
         self.model = YOLO(weights)
         self.imgsz = imgsz
         self.conf = conf
         self.iou = iou
         self.device = device
+        self.roi = roi
         self.logger = configure_logger("detector")
 
-    def predict(self, source: str | Path):
-        return self.model(
-            source,
-            imgsz=self.imgsz,
-            conf=self.conf,
-            iou=self.iou,
-            device=self.device,
-            verbose=False,
-        )
-
-    def predict_batch(self, sources: List[str | Path]):
+    def predict(self, source: str | Path | np.ndarray, roi: Optional[RegionOfInterest] = None):
+        roi = roi or self.roi
+        if roi is None:
+            with span("detector.inference"):
+                return self.model(
+                    source,
+                    imgsz=self.imgsz,
+                    conf=self.conf,
+                    iou=self.iou,
+                    device=self.device,
+                    verbose=False,
+                )
+
+        # Decode ourselves so the crop applies to every frame of a video, directory or stream too.
+        frames = [(None, source)] if isinstance(source, np.ndarray) else iter_frames(source)
+        restored = []
+        for path, frame in traced_iter(frames, "detector.decode"):
+            with span("roi.crop"):
+                crop, offset = roi.crop(frame)
+            with span("detector.inference"):
+                results = self.model(
+                    crop,
+                    imgsz=self.imgsz,
+                    conf=self.conf,
+                    iou=self.iou,
+                    device=self.device,
+                    verbose=False,
+                )
+            restored.extend(roi.restore_result(result, frame, offset, path) for result in results)
+        return restored
+
+    def predict_batch(
+        self,
+        sources: List[str | Path | np.ndarray],
+        roi: Optional[RegionOfInterest] = None,
+        batch_size: int = 16,
+    ):
+        """Run ``sources`` through the model ``batch_size`` at a time.
+
+        Returns one result list per source, matching ``predict``.
+        """
+        roi = roi or self.roi
         outputs = []
-        for src in sources:
-            outputs.append(self.predict(src))
-        return outputs
+        for start in range(0, len(sources), batch_size):
+            chunk = sources[start : start + batch_size]
+            if roi is None:
+                with span("detector.inference", batch=len(chunk)):
+                    results = self.model(
+                        list(chunk),
+                        imgsz=self.imgsz,
+                        conf=self.conf,
+                        iou=self.iou,
+                        device=self.device,
+                        verbose=False,
+                    )
+                outputs.extend([result] for result in results)
+                continue
 
+            with span("detector.decode", batch=len(chunk)):
+                frames = [src if isinstance(src, np.ndarray) else cv2.imread(str(src)) for src in chunk]
+            for src, frame in zip(chunk, frames):
+                if frame is None:
+                    raise FileNotFoundError(f"Image not found: {src}")
+            with span("roi.crop", batch=len(chunk)):
+                crops = [roi.crop(frame) for frame in frames]
+            with span("detector.inference", batch=len(chunk)):
+                results = self.model(
+                    [crop for crop, _ in crops],
+                    imgsz=self.imgsz,
+                    conf=self.conf,
+                    iou=self.iou,
+                    device=self.device,
+                    verbose=False,
+                )
+            for src, frame, (_, offset), result in zip(chunk, frames, crops, results):
+                path = None if isinstance(src, np.ndarray) else str(src)
+                outputs.append([roi.restore_result(result, frame, offset, path)])
+        return outputs
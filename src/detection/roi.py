@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.config import load_config
+
+PAD_VALUE = 114
+Offset = Tuple[int, int]
+
+
+class RegionOfInterest:
+    """Road-band polygon in normalised ``(x, y)`` frame coordinates.
+
+    ``crop`` cuts frames down to the polygon's bounding box (optionally greying
+    out pixels outside the polygon) and ``restore_result`` maps detections on
+    the crop back to full-frame coordinates.
+    """
+
+    def __init__(self, polygon: Sequence[Sequence[float]], mask_outside: bool = True) -> None:
+        self.polygon = np.clip(np.asarray(polygon, dtype=np.float64), 0.0, 1.0)
+        if self.polygon.ndim != 2 or self.polygon.shape[0] < 3 or self.polygon.shape[1] != 2:
+            raise ValueError("ROI polygon needs at least three (x, y) points.")
+        self.mask_outside = mask_outside
+        self._cache: Dict[Tuple[int, int], Tuple[Tuple[int, int, int, int], Optional[np.ndarray]]] = {}
+
+    @classmethod
+    def from_config(cls, cfg: Dict) -> Optional["RegionOfInterest"]:
+        if not cfg.get("enabled", True):
+            return None
+        kind = cfg.get("type", "polygon")
+        if kind == "polygon":
+            points = cfg["points"]
+        elif kind == "trapezoid":
+            points = [
+                [cfg["top_left_x"], cfg["top_y"]],
+                [cfg["top_right_x"], cfg["top_y"]],
+                [cfg["bottom_right_x"], cfg["bottom_y"]],
+                [cfg["bottom_left_x"], cfg["bottom_y"]],
+            ]
+        else:
+            raise ValueError(f"Unsupported ROI type: {kind}")
+        return cls(points, mask_outside=cfg.get("mask_outside", True))
+
+    def to_config(self) -> Dict:
+        return {
+            "enabled": True,
+            "type": "polygon",
+            "points": [[round(float(x), 4), round(float(y), 4)] for x, y in self.polygon],
+            "mask_outside": self.mask_outside,
+        }
+
+    def _geometry(self, height: int, width: int) -> Tuple[Tuple[int, int, int, int], Optional[np.ndarray]]:
+        key = (height, width)
+        if key not in self._cache:
+            pixels = np.round(self.polygon * [width, height]).astype(np.int32)
+            x0, y0 = pixels.min(axis=0)
+            x1, y1 = pixels.max(axis=0)
+            x0, y0 = max(int(x0), 0), max(int(y0), 0)
+            x1, y1 = min(int(x1), width), min(int(y1), height)
+            mask = None
+            if self.mask_outside:
+                mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+                cv2.fillPoly(mask, [pixels - [x0, y0]], 255)
+            self._cache[key] = ((x0, y0, x1, y1), mask)
+        return self._cache[key]
+
+    def crop(self, frame: np.ndarray) -> Tuple[np.ndarray, Offset]:
+        (x0, y0, x1, y1), mask = self._geometry(*frame.shape[:2])
+        crop = frame[y0:y1, x0:x1]
+        if mask is not None:
+            crop = crop.copy()
+            crop[mask == 0] = PAD_VALUE
+        return crop, (x0, y0)
+
+    @staticmethod
+    def offset_boxes(xyxy: np.ndarray, offset: Offset) -> np.ndarray:
+        return xyxy + np.array([offset[0], offset[1], offset[0], offset[1]], dtype=xyxy.dtype)
+
+    @staticmethod
+    def restore_result(result, frame: np.ndarray, offset: Offset, path: Optional[str] = None):
+        """Rewrite an Ultralytics ``Results`` produced on a crop into full-frame coordinates."""
+        result.orig_img = frame
+        result.orig_shape = frame.shape[:2]
+        if path is not None:
+            result.path = path
+        if result.boxes is not None:
+            data = result.boxes.data.clone()
+            data[:, [0, 2]] += offset[0]
+            data[:, [1, 3]] += offset[1]
+            result.update(boxes=data)
+        return result
+
+
+def load_rois(path: str | Path) -> Tuple[Dict[str, RegionOfInterest], Optional[str]]:
+    """Return every enabled camera ROI from ``configs/roi.yaml`` plus the default camera name."""
+    cfg = load_config(path)
+    rois: Dict[str, RegionOfInterest] = {}
+    for camera, camera_cfg in (cfg.get("cameras") or {}).items():
+        roi = RegionOfInterest.from_config(camera_cfg)
+        if roi is not None:
+            rois[camera] = roi
+    return rois, cfg.get("default_camera")
+
+
+def derive_roi(
+    boxes: Iterable[Sequence[float]],
+    frame_size: Tuple[int, int],
+    bands: int = 8,
+    coverage: float = 0.98,
+    margin: float = 0.03,
+) -> RegionOfInterest:
+    """Fit a road polygon around where historical detections actually occur.
+
+    The vertical extent covers ``coverage`` of all boxes; within each of
+    ``bands`` horizontal slices the horizontal extent does the same, giving a
+    polygon that widens towards the bottom of the frame like the road does.
+    """
+    width, height = frame_size
+    array = np.asarray(list(boxes), dtype=np.float64).reshape(-1, 4)
+    if len(array) == 0:
+        raise ValueError("No detections supplied to derive an ROI from.")
+    norm = array / [width, height, width, height]
+    tail = (1.0 - coverage) / 2 * 100
+
+    top = max(float(np.percentile(norm[:, 1], tail)) - margin, 0.0)
+    bottom = min(float(np.percentile(norm[:, 3], 100 - tail)) + margin, 1.0)
+    overall = (
+        float(np.percentile(norm[:, 0], tail)),
+        float(np.percentile(norm[:, 2], 100 - tail)),
+    )
+
+    edges = np.linspace(top, bottom, bands + 1)
+    left: List[List[float]] = []
+    right: List[List[float]] = []
+    for y_start, y_end in zip(edges[:-1], edges[1:]):
+        inside = (norm[:, 1] <= y_end) & (norm[:, 3] >= y_start)
+        if inside.any():
+            x_min = float(np.percentile(norm[inside, 0], tail))
+            x_max = float(np.percentile(norm[inside, 2], 100 - tail))
+        else:
+            x_min, x_max = overall
+        x_min, x_max = max(x_min - margin, 0.0), min(x_max + margin, 1.0)
+        left.extend([[x_min, y_start], [x_min, y_end]])
+        right.extend([[x_max, y_start], [x_max, y_end]])
+    return RegionOfInterest(left + right[::-1])
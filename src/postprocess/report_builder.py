@@ -3,13 +3,14 @@ from __future__ import annotations
 import csv
 import json
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional
 
 import folium
 from shapely.geometry import Point, mapping
 
 from src.config import load_config
 from src.utils.logger import configure_logger
+from src.utils.tracing import span
 
 
 class ReportBuilder:
@@ -36,8 +37,7 @@ class ReportBuilder:
                 deduped.append(row)
         return deduped
 
-    def _write_csv(self, rows: List[Dict]) -> Path:
-        csv_path = Path(self.cfg["output_csv"])
+    def _write_csv(self, rows: List[Dict], csv_path: Path) -> Path:
         csv_path.parent.mkdir(parents=True, exist_ok=True)
         with csv_path.open("w", newline="", encoding="utf-8") as handle:
             writer = csv.DictWriter(handle, fieldnames=rows[0].keys() if rows else [])
@@ -46,8 +46,7 @@ class ReportBuilder:
                 writer.writerows(rows)
         return csv_path
 
-    def _write_geojson(self, rows: List[Dict]) -> Path:
-        geojson_path = Path(self.cfg["output_geojson"])
+    def _write_geojson(self, rows: List[Dict], geojson_path: Path) -> Path:
         geojson_path.parent.mkdir(parents=True, exist_ok=True)
         features = []
         for row in rows:
@@ -67,8 +66,7 @@ class ReportBuilder:
         geojson_path.write_text(json.dumps(geojson, indent=2), encoding="utf-8")
         return geojson_path
 
-    def _write_map(self, rows: List[Dict]) -> Path:
-        html_path = Path(self.cfg["map"]["output_html"])
+    def _write_map(self, rows: List[Dict], html_path: Path) -> Path:
         html_path.parent.mkdir(parents=True, exist_ok=True)
         if not rows:
             html_path.write_text("<p>No rows to map.</p>", encoding="utf-8")
@@ -81,7 +79,7 @@ class ReportBuilder:
             lon = row.get("lon")
             if lat is None or lon is None:
                 continue
-            popup = f\"\"\"{row.get('class_id', 'unknown')} | conf={row.get('confidence', 0):.2f}\"\"\"
+            popup = f"{row.get('class_id', 'unknown')} | conf={float(row.get('confidence', 0)):.2f}"
             folium.CircleMarker(
                 location=[lat, lon],
                 radius=6,
@@ -91,18 +89,30 @@ class ReportBuilder:
         fmap.save(html_path)
         return html_path
 
-    def build(self, rows: List[Dict]) -> Dict[str, Path]:
+    def _output_path(self, configured: str, output_dir: Optional[str | Path]) -> Path:
+        path = Path(configured)
+        return Path(output_dir) / path.name if output_dir else path
+
+    def build(self, rows: List[Dict], output_dir: Optional[str | Path] = None) -> Dict[str, Path]:
+        """Write CSV/GeoJSON/map artifacts; ``output_dir`` redirects them away from the configured paths."""
         if not rows:
             raise ValueError("No detection rows supplied.")
 
         dedupe_distance = float(self.cfg.get("dedupe_distance_m", 5))
-        processed = self._dedupe(rows, dedupe_distance)
-        outputs = {
-            "csv": self._write_csv(processed),
-            "geojson": self._write_geojson(processed),
-        }
+        with span("report.dedupe", rows=len(rows)):
+            processed = self._dedupe(rows, dedupe_distance)
+        outputs: Dict[str, Path] = {}
+        with span("report.write_csv"):
+            outputs["csv"] = self._write_csv(processed, self._output_path(self.cfg["output_csv"], output_dir))
+        with span("report.write_geojson"):
+            outputs["geojson"] = self._write_geojson(
+                processed, self._output_path(self.cfg["output_geojson"], output_dir)
+            )
         if self.cfg.get("map", {}).get("enabled", False):
-            outputs["map_html"] = self._write_map(processed)
+            with span("report.write_map"):
+                outputs["map_html"] = self._write_map(
+                    processed, self._output_path(self.cfg["map"]["output_html"], output_dir)
+                )
         self.logger.info("Generated report artifacts: %s", outputs)
         return outputs
 
@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+import lap
+import numpy as np
+
+TRACKED, LOST, REMOVED = 1, 2, 3
+
+# Columns of the array returned by ``ByteTracker.update``.
+OUTPUT_COLUMNS = ("xmin", "ymin", "xmax", "ymax", "track_id", "score", "class_id", "det_index")
+
+
+class KalmanFilterXYAH:
+    """Constant-velocity Kalman filter over (cx, cy, aspect, h), batched over tracks."""
+
+    _std_position = 1.0 / 20
+    _std_velocity = 1.0 / 160
+
+    def __init__(self) -> None:
+        self.motion = np.eye(8)
+        self.motion[:4, 4:] = np.eye(4)
+        self.observation = np.eye(4, 8)
+
+    def _position_std(self, height: np.ndarray, scale: float, aspect: float = 1e-2) -> np.ndarray:
+        return np.stack(
+            [height * scale, height * scale, np.full_like(height, aspect), height * scale],
+            axis=1,
+        )
+
+    def initiate(self, measurements: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        means = np.concatenate([measurements, np.zeros_like(measurements)], axis=1)
+        h = measurements[:, 3]
+        std = np.concatenate(
+            [
+                self._position_std(h, 2 * self._std_position),
+                np.stack(
+                    [
+                        10 * self._std_velocity * h,
+                        10 * self._std_velocity * h,
+                        np.full_like(h, 1e-5),
+                        10 * self._std_velocity * h,
+                    ],
+                    axis=1,
+                ),
+            ],
+            axis=1,
+        )
+        covariances = np.einsum("ni,ij->nij", np.square(std), np.eye(8))
+        return means, covariances
+
+    def predict(self, means: np.ndarray, covariances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        h = means[:, 3]
+        std = np.concatenate(
+            [
+                self._position_std(h, self._std_position),
+                np.stack(
+                    [
+                        self._std_velocity * h,
+                        self._std_velocity * h,
+                        np.full_like(h, 1e-5),
+                        self._std_velocity * h,
+                    ],
+                    axis=1,
+                ),
+            ],
+            axis=1,
+        )
+        noise = np.einsum("ni,ij->nij", np.square(std), np.eye(8))
+        means = means @ self.motion.T
+        covariances = self.motion @ covariances @ self.motion.T + noise
+        return means, covariances
+
+    def update(
+        self,
+        means: np.ndarray,
+        covariances: np.ndarray,
+        measurements: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        std = self._position_std(means[:, 3], self._std_position, aspect=1e-1)
+        noise = np.einsum("ni,ij->nij", np.square(std), np.eye(4))
+        projected_mean = means @ self.observation.T
+        projected_cov = self.observation @ covariances @ self.observation.T + noise
+        # K = P H^T S^-1, solved as S K^T = H P for every track at once.
+        gain = np.linalg.solve(projected_cov, self.observation @ covariances).transpose(0, 2, 1)
+        innovation = measurements - projected_mean
+        means = means + np.einsum("nij,nj->ni", gain, innovation)
+        covariances = covariances - gain @ projected_cov @ gain.transpose(0, 2, 1)
+        return means, covariances
+
+
+def xyxy_to_xyah(boxes: np.ndarray) -> np.ndarray:
+    w = boxes[:, 2] - boxes[:, 0]
+    h = boxes[:, 3] - boxes[:, 1]
+    return np.stack([boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w / np.maximum(h, 1e-6), h], axis=1)
+
+
+def xyah_to_xyxy(states: np.ndarray) -> np.ndarray:
+    h = states[:, 3]
+    w = states[:, 2] * h
+    x1 = states[:, 0] - w / 2
+    y1 = states[:, 1] - h / 2
+    return np.stack([x1, y1, x1 + w, y1 + h], axis=1)
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between ``(N, 4)`` and ``(M, 4)`` xyxy boxes."""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float64)
+    tl = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    br = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def linear_assignment(cost: np.ndarray, thresh: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Solve the assignment with ``lapx``; returns matches and unmatched rows/cols."""
+    rows, cols = cost.shape
+    if cost.size == 0:
+        return np.empty((0, 2), dtype=int), np.arange(rows), np.arange(cols)
+    _, x, y = lap.lapjv(cost, extend_cost=True, cost_limit=thresh)
+    matches = np.array([[ix, mx] for ix, mx in enumerate(x) if mx >= 0], dtype=int).reshape(-1, 2)
+    return matches, np.where(x < 0)[0], np.where(y < 0)[0]
+
+
+class Track:
+    __slots__ = (
+        "track_id",
+        "mean",
+        "covariance",
+        "score",
+        "class_id",
+        "det_index",
+        "state",
+        "is_activated",
+        "frame_id",
+        "start_frame",
+        "tracklet_len",
+    )
+
+    def __init__(self, track_id: int, mean: np.ndarray, covariance: np.ndarray, frame_id: int) -> None:
+        self.track_id = track_id
+        self.mean = mean
+        self.covariance = covariance
+        self.score = 0.0
+        self.class_id = -1
+        self.det_index = -1
+        self.state = TRACKED
+        self.is_activated = False
+        self.frame_id = frame_id
+        self.start_frame = frame_id
+        self.tracklet_len = 0
+
+
+def _boxes(tracks: Sequence[Track]) -> np.ndarray:
+    if not tracks:
+        return np.empty((0, 4))
+    return xyah_to_xyxy(np.stack([track.mean[:4] for track in tracks]))
+
+
+class ByteTracker:
+    """Project-owned ByteTrack driven by the ``tracker`` section of ``configs/tracking.yaml``.
+
+    ``update`` takes plain ``xyxy``/score/class arrays, so any detector backend can
+    feed it, and all association costs are computed as vectorised IoU matrices.
+    """
+
+    def __init__(
+        self,
+        track_thresh: float = 0.5,
+        track_buffer: int = 30,
+        match_thresh: float = 0.8,
+        min_box_area: float = 10,
+        mot20: bool = False,
+        frame_rate: int = 30,
+        low_thresh: float = 0.1,
+    ) -> None:
+        self.track_thresh = track_thresh
+        self.new_track_thresh = track_thresh + 0.1
+        self.low_thresh = low_thresh
+        self.match_thresh = match_thresh
+        self.min_box_area = min_box_area
+        self.mot20 = mot20
+        self.max_time_lost = int(frame_rate / 30.0 * track_buffer)
+        self.kalman = KalmanFilterXYAH()
+        self.reset()
+
+    @classmethod
+    def from_config(cls, tracker_cfg: Dict) -> "ByteTracker":
+        return cls(
+            track_thresh=float(tracker_cfg.get("track_thresh", 0.5)),
+            track_buffer=int(tracker_cfg.get("track_buffer", 30)),
+            match_thresh=float(tracker_cfg.get("match_thresh", 0.8)),
+            min_box_area=float(tracker_cfg.get("min_box_area", 10)),
+            mot20=bool(tracker_cfg.get("mot20", False)),
+            frame_rate=int(tracker_cfg.get("frame_rate", 30)),
+            low_thresh=float(tracker_cfg.get("low_thresh", 0.1)),
+        )
+
+    def reset(self) -> None:
+        self.frame_id = 0
+        self._next_id = 1
+        self.tracked: List[Track] = []
+        self.lost: List[Track] = []
+
+    def _cost(self, tracks: Sequence[Track], boxes: np.ndarray, scores: np.ndarray, fuse: bool) -> np.ndarray:
+        iou = iou_matrix(_boxes(tracks), boxes)
+        if fuse and iou.size:
+            iou = iou * scores[None, :]
+        return 1.0 - iou
+
+    def _apply(
+        self,
+        tracks: Sequence[Track],
+        matches: np.ndarray,
+        boxes: np.ndarray,
+        scores: np.ndarray,
+        classes: np.ndarray,
+        det_indices: np.ndarray,
+    ) -> None:
+        if len(matches) == 0:
+            return
+        matched = [tracks[i] for i in matches[:, 0]]
+        dets = matches[:, 1]
+        means, covariances = self.kalman.update(
+            np.stack([track.mean for track in matched]),
+            np.stack([track.covariance for track in matched]),
+            xyxy_to_xyah(boxes[dets]),
+        )
+        for track, mean, covariance, det in zip(matched, means, covariances, dets):
+            if track.state == TRACKED:
+                track.tracklet_len += 1
+            else:
+                track.tracklet_len = 0
+            track.mean, track.covariance = mean, covariance
+            track.score, track.class_id = float(scores[det]), int(classes[det])
+            track.det_index = int(det_indices[det])
+            track.state, track.is_activated, track.frame_id = TRACKED, True, self.frame_id
+
+    def update(self, boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray) -> np.ndarray:
+        """Advance one frame; returns an ``(N, 8)`` array laid out as ``OUTPUT_COLUMNS``."""
+        self.frame_id += 1
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+        classes = np.asarray(classes).reshape(-1)
+        indices = np.arange(len(boxes))
+        fuse = not self.mot20
+
+        high = scores >= self.track_thresh
+        low = (scores > self.low_thresh) & ~high
+        hi_boxes, hi_scores, hi_classes, hi_idx = boxes[high], scores[high], classes[high], indices[high]
+
+        confirmed = [track for track in self.tracked if track.is_activated]
+        unconfirmed = [track for track in self.tracked if not track.is_activated]
+        pool = confirmed + self.lost
+        if pool:
+            means = np.stack([track.mean for track in pool])
+            means[[track.state != TRACKED for track in pool], 7] = 0
+            means, covariances = self.kalman.predict(means, np.stack([track.covariance for track in pool]))
+            for track, mean, covariance in zip(pool, means, covariances):
+                track.mean, track.covariance = mean, covariance
+
+        # First association: confident detections against tracked + lost tracks.
+        matches, u_track, u_det = linear_assignment(
+            self._cost(pool, hi_boxes, hi_scores, fuse), self.match_thresh
+        )
+        self._apply(pool, matches, hi_boxes, hi_scores, hi_classes, hi_idx)
+
+        # Second association: low-score detections rescue still-tracked tracks.
+        remaining = [pool[i] for i in u_track if pool[i].state == TRACKED]
+        lo_boxes, lo_scores, lo_classes, lo_idx = boxes[low], scores[low], classes[low], indices[low]
+        matches, u_remaining, _ = linear_assignment(self._cost(remaining, lo_boxes, lo_scores, False), 0.5)
+        self._apply(remaining, matches, lo_boxes, lo_scores, lo_classes, lo_idx)
+        newly_lost = [remaining[i] for i in u_remaining]
+        for track in newly_lost:
+            track.state = LOST
+
+        # Tentative tracks from the previous frame must match immediately or die.
+        hi_boxes, hi_scores = hi_boxes[u_det], hi_scores[u_det]
+        hi_classes, hi_idx = hi_classes[u_det], hi_idx[u_det]
+        matches, u_unconfirmed, u_det = linear_assignment(
+            self._cost(unconfirmed, hi_boxes, hi_scores, fuse), 0.7
+        )
+        self._apply(unconfirmed, matches, hi_boxes, hi_scores, hi_classes, hi_idx)
+        for i in u_unconfirmed:
+            unconfirmed[i].state = REMOVED
+
+        new_dets = [i for i in u_det if hi_scores[i] >= self.new_track_thresh]
+        if new_dets:
+            means, covariances = self.kalman.initiate(xyxy_to_xyah(hi_boxes[new_dets]))
+            for det, mean, covariance in zip(new_dets, means, covariances):
+                track = Track(self._next_id, mean, covariance, self.frame_id)
+                self._next_id += 1
+                track.score, track.class_id = float(hi_scores[det]), int(hi_classes[det])
+                track.det_index = int(hi_idx[det])
+                track.is_activated = self.frame_id == 1
+                self.tracked.append(track)
+
+        for track in self.lost:
+            if track.state == LOST and self.frame_id - track.frame_id > self.max_time_lost:
+                track.state = REMOVED
+
+        every = self.tracked + self.lost
+        self.tracked = [track for track in every if track.state == TRACKED]
+        self.lost = [track for track in every if track.state == LOST]
+        self._remove_duplicates()
+
+        outputs = [
+            track
+            for track in self.tracked
+            if track.is_activated and track.frame_id == self.frame_id
+        ]
+        if not outputs:
+            return np.empty((0, len(OUTPUT_COLUMNS)))
+        xyxy = _boxes(outputs)
+        area = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+        meta = np.array(
+            [[track.track_id, track.score, track.class_id, track.det_index] for track in outputs],
+            dtype=np.float64,
+        )
+        result = np.concatenate([xyxy, meta], axis=1)
+        return result[area >= self.min_box_area]
+
+    def _remove_duplicates(self) -> None:
+        """Drop the younger of any tracked/lost pair that overlap almost entirely."""
+        if not self.tracked or not self.lost:
+            return
+        overlap = iou_matrix(_boxes(self.tracked), _boxes(self.lost)) > 0.85
+        drop_tracked, drop_lost = set(), set()
+        for i, j in zip(*np.nonzero(overlap)):
+            age_tracked = self.tracked[i].frame_id - self.tracked[i].start_frame
+            age_lost = self.lost[j].frame_id - self.lost[j].start_frame
+            if age_tracked > age_lost:
+                drop_lost.add(j)
+            else:
+                drop_tracked.add(i)
+        self.tracked = [t for i, t in enumerate(self.tracked) if i not in drop_tracked]
+        self.lost = [t for j, t in enumerate(self.lost) if j not in drop_lost]
@@ -2,18 +2,37 @@ from __future__ import annotations
 
 import csv
 from pathlib import Path
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 from ultralytics import YOLO
 
 from src.config import load_config
+from src.detection.roi import RegionOfInterest
+from src.tracking.bytetrack import ByteTracker
 from src.utils.logger import configure_logger
+from src.utils.tracing import span, traced_iter
+from src.utils.video import iter_frames
 
 MetadataFn = Callable[[int], Dict[str, float | int | str]]
+# Called with the number of frames processed so far; may raise to abort the run.
+ProgressFn = Callable[[int], None]
+# (source path, xyxy, confidences, class ids) for one frame in full-frame coordinates.
+FrameDetections = Tuple[str, np.ndarray, np.ndarray, np.ndarray]
+
+
+def _speed_args(result) -> Dict[str, float]:
+    # Ultralytics' own per-stage timings; the remainder of the span is frame decode.
+    return {f"{stage}_ms": round(ms, 3) for stage, ms in (result.speed or {}).items() if ms is not None}
 
 
 class TrackingPipeline:
-    """Wrapper around Ultralytics YOLO tracking for consistent logging."""
+    """YOLO detection plus multi-object tracking with consistent row logging.
+
+    ``tracker.engine: native`` (default) runs the project-owned ``ByteTracker``
+    with the thresholds from ``configs/tracking.yaml``; ``ultralytics`` falls back
+    to ``model.track`` with the stock tracker YAML named by ``tracker.type``.
+    """
 
     def __init__(
         self,
@@ -23,6 +42,7 @@ class TrackingPipeline:
         conf: float = 0.25,
         iou: float = 0.45,
         device: str | int = "cpu",
+        roi: Optional[RegionOfInterest] = None,
     ) -> None:
         self.logger = configure_logger("tracking")
         self.model = YOLO(detector_weights)
@@ -32,6 +52,7 @@ class TrackingPipeline:
         self.conf = conf
         self.iou = iou
         self.device = device
+        self.roi = roi
 
     def _result_to_rows(
         self,
@@ -66,39 +87,183 @@ class TrackingPipeline:
             rows.append(row)
         return rows
 
-    def run(
+    def _tracks_to_rows(
         self,
+        tracks,
+        frame_index: int,
         source: str,
-        output_csv: str | Path | None = None,
-        metadata_fn: Optional[MetadataFn] = None,
+        metadata: Optional[Dict[str, float | int | str]] = None,
+    ) -> List[Dict[str, float | int | str]]:
+        rows: List[Dict[str, float | int | str]] = []
+        for xmin, ymin, xmax, ymax, track_id, score, class_id, _ in tracks.tolist():
+            row: Dict[str, float | int | str] = {
+                "frame": frame_index,
+                "track_id": int(track_id),
+                "class_id": int(class_id),
+                "confidence": float(score),
+                "xmin": float(xmin),
+                "ymin": float(ymin),
+                "xmax": float(xmax),
+                "ymax": float(ymax),
+                "source": source,
+            }
+            if metadata:
+                row.update(metadata)
+            rows.append(row)
+        return rows
+
+    def _iter_detections(
+        self,
+        source: str,
+        roi: Optional[RegionOfInterest],
+    ) -> Iterator[FrameDetections]:
+        if roi is None:
+            results = self.model.predict(
+                source=source,
+                conf=self.conf,
+                iou=self.iou,
+                imgsz=self.imgsz,
+                device=self.device,
+                stream=True,
+                verbose=False,
+            )
+            for result in traced_iter(results, "detector.stream", _speed_args):
+                boxes = result.boxes
+                if boxes is None:
+                    yield result.path, np.empty((0, 4)), np.empty(0), np.empty(0)
+                    continue
+                yield (
+                    result.path,
+                    boxes.xyxy.cpu().numpy(),
+                    boxes.conf.cpu().numpy(),
+                    boxes.cls.cpu().numpy(),
+                )
+            return
+
+        # Only the road band goes through the network; boxes are shifted back.
+        for path, frame in traced_iter(iter_frames(source), "pipeline.decode"):
+            with span("roi.crop"):
+                crop, offset = roi.crop(frame)
+            with span("detector.inference"):
+                result = self.model.predict(
+                    crop,
+                    conf=self.conf,
+                    iou=self.iou,
+                    imgsz=self.imgsz,
+                    device=self.device,
+                    verbose=False,
+                )[0]
+            boxes = result.boxes
+            if boxes is None:
+                yield path, np.empty((0, 4)), np.empty(0), np.empty(0)
+                continue
+            yield (
+                path,
+                roi.offset_boxes(boxes.xyxy.cpu().numpy(), offset),
+                boxes.conf.cpu().numpy(),
+                boxes.cls.cpu().numpy(),
+            )
+
+    def _run_native(
+        self,
+        source: str,
+        metadata_fn: Optional[MetadataFn],
+        roi: Optional[RegionOfInterest],
+        progress_fn: Optional[ProgressFn],
+    ) -> List[Dict[str, float | int | str]]:
+        tracker = ByteTracker.from_config(self.tracker_cfg)
+        rows: List[Dict[str, float | int | str]] = []
+        for frame_index, (path, xyxy, confs, cls_ids) in enumerate(self._iter_detections(source, roi)):
+            with span("tracker.update", detections=len(xyxy)):
+                tracks = tracker.update(xyxy, confs, cls_ids)
+            with span("pipeline.metadata_fn"):
+                metadata = metadata_fn(frame_index) if metadata_fn else None
+            with span("pipeline.tracks_to_rows"):
+                rows.extend(self._tracks_to_rows(tracks, frame_index, path, metadata))
+            self.logger.debug(
+                "Frame %d: %d detections, %d tracks",
+                frame_index,
+                len(xyxy),
+                len(tracks),
+                extra={"frame": frame_index},
+            )
+            if progress_fn:
+                progress_fn(frame_index + 1)
+        return rows
+
+    def _run_ultralytics(
+        self,
+        source: str,
+        metadata_fn: Optional[MetadataFn],
+        roi: Optional[RegionOfInterest],
+        progress_fn: Optional[ProgressFn],
     ) -> List[Dict[str, float | int | str]]:
         tracker_type = self.tracker_cfg.get("type", "bytetrack")
         tracker_yaml = f"{tracker_type}.yaml" if tracker_type.endswith(".yaml") is False else tracker_type
         rows: List[Dict[str, float | int | str]] = []
-
-        results = self.model.track(
-            source=source,
+        track_args = dict(
             conf=self.conf,
             iou=self.iou,
             imgsz=self.imgsz,
             tracker=tracker_yaml,
             device=self.device,
-            stream=True,
             persist=True,
         )
 
-        for frame_index, result in enumerate(results):
-            metadata = metadata_fn(frame_index) if metadata_fn else None
-            rows.extend(self._result_to_rows(result, frame_index, metadata))
+        def track_roi():
+            for path, frame in iter_frames(source):
+                crop, offset = roi.crop(frame)
+                yield roi.restore_result(self.model.track(crop, **track_args)[0], frame, offset, path)
+
+        if roi is None:
+            results = self.model.track(source=source, stream=True, **track_args)
+        else:
+            results = track_roi()
+
+        for frame_index, result in enumerate(traced_iter(results, "detector.track", _speed_args)):
+            with span("pipeline.metadata_fn"):
+                metadata = metadata_fn(frame_index) if metadata_fn else None
+            with span("pipeline.result_to_rows"):
+                rows.extend(self._result_to_rows(result, frame_index, metadata))
+            self.logger.debug(
+                "Frame %d: %d tracked boxes",
+                frame_index,
+                0 if result.boxes is None else len(result.boxes),
+                extra={"frame": frame_index},
+            )
+            if progress_fn:
+                progress_fn(frame_index + 1)
+        return rows
+
+    def run(
+        self,
+        source: str,
+        output_csv: str | Path | None = None,
+        metadata_fn: Optional[MetadataFn] = None,
+        roi: Optional[RegionOfInterest] = None,
+        progress_fn: Optional[ProgressFn] = None,
+    ) -> List[Dict[str, float | int | str]]:
+        roi = roi or self.roi
+        engine = self.tracker_cfg.get("engine", "native")
+        with span("pipeline.run", engine=engine, roi=roi is not None):
+            if engine == "native":
+                if self.tracker_cfg.get("type", "bytetrack") != "bytetrack":
+                    raise ValueError("The native tracker engine only implements ByteTrack.")
+                rows = self._run_native(source, metadata_fn, roi, progress_fn)
+            elif engine == "ultralytics":
+                rows = self._run_ultralytics(source, metadata_fn, roi, progress_fn)
+            else:
+                raise ValueError(f"Unsupported tracker engine: {engine}")
 
         if output_csv:
             csv_path = Path(output_csv)
             csv_path.parent.mkdir(parents=True, exist_ok=True)
-            with csv_path.open("w", newline="", encoding="utf-8") as handle:
-                writer = csv.DictWriter(handle, fieldnames=rows[0].keys() if rows else [])
-                if rows:
-                    writer.writeheader()
-                    writer.writerows(rows)
+            with span("pipeline.write_csv", rows=len(rows)):
+                with csv_path.open("w", newline="", encoding="utf-8") as handle:
+                    writer = csv.DictWriter(handle, fieldnames=rows[0].keys() if rows else [])
+                    if rows:
+                        writer.writeheader()
+                        writer.writerows(rows)
             self.logger.info("Saved tracking log -> %s", csv_path)
 
         return rows
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Type
+
+from ultralytics.data import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer, DetectionValidator
+from ultralytics.utils import colorstr
+from ultralytics.utils.torch_utils import de_parallel
+
+from src.data.image_cache import ImageCache, cache_dir_for
+
+
+class CachedYOLODataset(YOLODataset):
+    """YOLO dataset that serves resized images from pre-built cache shards."""
+
+    def __init__(self, *args, image_cache: ImageCache, **kwargs) -> None:
+        self.image_cache = image_cache
+        super().__init__(*args, **kwargs)
+
+    def load_image(self, i, rect_mode=True):
+        if rect_mode and self.ims[i] is None:
+            cached = self.image_cache.load(self.im_files[i])
+            if cached is not None:
+                if self.augment:
+                    # Mosaic samples its partner images from this buffer.
+                    self.buffer.append(i)
+                    if 1 < len(self.buffer) >= self.max_buffer_length:
+                        self.buffer.pop(0)
+                return cached
+        return super().load_image(i, rect_mode)
+
+
+def build_cached_dataset(cfg, img_path, batch, data, cache_root, mode="train", rect=False, stride=32):
+    """Mirror of ``ultralytics.data.build_yolo_dataset`` backed by the image cache."""
+    return CachedYOLODataset(
+        img_path=img_path,
+        imgsz=cfg.imgsz,
+        batch_size=batch,
+        augment=mode == "train",
+        hyp=cfg,
+        rect=cfg.rect or rect,
+        cache=cfg.cache or None,
+        single_cls=cfg.single_cls or False,
+        stride=int(stride),
+        pad=0.0 if mode == "train" else 0.5,
+        prefix=colorstr(f"{mode}: "),
+        task=cfg.task,
+        classes=cfg.classes,
+        data=data,
+        fraction=cfg.fraction if mode == "train" else 1.0,
+        image_cache=ImageCache(cache_dir_for(cache_root, img_path), cfg.imgsz),
+    )
+
+
+class CachedDetectionTrainer(DetectionTrainer):
+    cache_root = Path("data/processed/yolo_cache")
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+        return build_cached_dataset(
+            self.args,
+            img_path,
+            batch,
+            self.data,
+            self.cache_root,
+            mode=mode,
+            rect=mode == "val",
+            stride=gs,
+        )
+
+
+class CachedDetectionValidator(DetectionValidator):
+    cache_root = Path("data/processed/yolo_cache")
+
+    def build_dataset(self, img_path, mode="val", batch=None):
+        return build_cached_dataset(
+            self.args,
+            img_path,
+            batch,
+            self.data,
+            self.cache_root,
+            mode=mode,
+            stride=self.stride,
+        )
+
+
+def cached_trainer(cache_root: str | Path) -> Type[CachedDetectionTrainer]:
+    return type("CachedDetectionTrainer", (CachedDetectionTrainer,), {"cache_root": Path(cache_root)})
+
+
+def cached_validator(cache_root: str | Path) -> Type[CachedDetectionValidator]:
+    return type("CachedDetectionValidator", (CachedDetectionValidator,), {"cache_root": Path(cache_root)})
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import math
+import multiprocessing
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import load_config
+from src.utils.logger import configure_logger
+
+STATE_NAME = "sweep_state.json"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Asynchronous successive-halving (ASHA) hyperparameter sweep."
+    )
+    parser.add_argument("--config", default="configs/sweep.yaml", help="Sweep configuration file.")
+    return parser.parse_args()
+
+
+def sample_params(space: Dict[str, Dict[str, Any]], rng: random.Random) -> Dict[str, Any]:
+    params: Dict[str, Any] = {}
+    for key, spec in space.items():
+        kind = spec.get("type", "choice")
+        if kind == "choice":
+            params[key] = rng.choice(spec["values"])
+        elif kind == "uniform":
+            params[key] = rng.uniform(spec["low"], spec["high"])
+        elif kind == "loguniform":
+            params[key] = math.exp(rng.uniform(math.log(spec["low"]), math.log(spec["high"])))
+        elif kind == "int":
+            params[key] = rng.randint(spec["low"], spec["high"])
+        else:
+            raise ValueError(f"Unsupported search space type for {key}: {kind}")
+    return params
+
+
+def rung_epochs(min_epochs: int, max_epochs: int, reduction_factor: int) -> List[int]:
+    """Epoch budget per rung: ``min_epochs * eta**k`` capped at ``max_epochs``."""
+    budgets = [min_epochs]
+    while budgets[-1] < max_epochs:
+        budgets.append(min(budgets[-1] * reduction_factor, max_epochs))
+    return budgets
+
+
+def rung_lr(lr0: float, lrf: float, start: int, end: int, total: int) -> Tuple[float, float]:
+    """``lr0``/``lrf`` for epochs ``start..end`` of one linear ``lr0 -> lr0 * lrf`` decay over ``total``."""
+
+    def factor(epoch: int) -> float:
+        return max(1 - epoch / total, 0) * (1 - lrf) + lrf
+
+    return lr0 * factor(start), factor(end) / factor(start)
+
+
+def score_metrics(metrics: Dict[str, float], weights: Dict[str, float]) -> float:
+    return sum(float(weight) * float(metrics.get(name, 0.0)) for name, weight in weights.items())
+
+
+def run_trial(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Train one trial for one rung; executed in a fresh worker process."""
+    from ultralytics import YOLO
+
+    from src.training.cached_dataset import cached_trainer
+    from src.training.train import build_train_kwargs
+
+    cfg = copy.deepcopy(job["base_cfg"])
+    cfg["training"].update(job["params"])
+    kwargs = build_train_kwargs(cfg)
+    kwargs.update(
+        epochs=job["epochs"],
+        project=job["project_dir"],
+        name=job["run_name"],
+        exist_ok=True,
+        device=job["device"],
+        plots=False,
+    )
+    if job["init_weights"]:
+        # Promoted trials continue from the previous rung's best weights on the slice of
+        # the full-budget LR decay this rung covers; only the optimizer state starts fresh.
+        kwargs["warmup_epochs"] = 0
+        kwargs["lr0"], kwargs["lrf"] = rung_lr(
+            kwargs["lr0"],
+            kwargs["lrf"],
+            job["start_epoch"],
+            job["start_epoch"] + job["epochs"],
+            job["total_epochs"],
+        )
+
+    cache_cfg = cfg.get("image_cache", {})
+    trainer = None
+    if cache_cfg.get("enabled", False):
+        trainer = cached_trainer(cache_cfg.get("root", "data/processed/yolo_cache"))
+
+    model = YOLO(job["init_weights"] or cfg["training"]["model"])
+    model.train(trainer=trainer, **kwargs)
+    # The final metrics are those of best.pt, so that is also the checkpoint promoted.
+    results = model.trainer.metrics
+    return {
+        "map50": float(results.get("metrics/mAP50(B)", 0.0)),
+        "recall": float(results.get("metrics/recall(B)", 0.0)),
+        "weights": str(model.trainer.best),
+    }
+
+
+class AshaSweep:
+    """Schedules trials so the top ``1/eta`` of each rung is promoted as soon as known."""
+
+    def __init__(self, cfg: Dict[str, Any]) -> None:
+        self.cfg = cfg
+        self.logger = configure_logger("sweep")
+        self.base_cfg = load_config(cfg["base_config"])
+        self.base_cfg.setdefault("logging", {})["use_wandb"] = False
+
+        sched = cfg["scheduler"]
+        self.num_trials = int(sched["num_trials"])
+        self.eta = int(sched.get("reduction_factor", 3))
+        self.rungs = rung_epochs(int(sched["min_epochs"]), int(sched["max_epochs"]), self.eta)
+        self.objective = cfg.get("objective", {"map50": 1.0, "recall": 0.0})
+        self.devices = list(cfg.get("resources", {}).get("devices", [0]))
+        self.seed = int(cfg.get("seed", 0))
+
+        output_cfg = cfg.get("output", {})
+        self.sweep_dir = Path(output_cfg.get("project_dir", "experiments/sweeps")) / output_cfg.get(
+            "name", "sweep"
+        )
+        self.sweep_dir.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.sweep_dir / STATE_NAME
+        self.trials: List[Dict[str, Any]] = self._load_state()
+
+    def _load_state(self) -> List[Dict[str, Any]]:
+        if not self.state_path.exists():
+            return []
+        state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        if state.get("rungs") != self.rungs:
+            raise ValueError(
+                f"Sweep state at {self.state_path} was created with rungs {state.get('rungs')}, "
+                f"config now gives {self.rungs}; use a new output name."
+            )
+        trials = state["trials"]
+        for trial in trials:
+            if trial["status"] == "running":
+                # Interrupted mid-rung; rerun that rung from its previous checkpoint.
+                trial["status"] = "pending"
+        self.logger.info("Resuming sweep with %d trials from %s", len(trials), self.state_path)
+        return trials
+
+    def _save_state(self) -> None:
+        state = {"rungs": self.rungs, "objective": self.objective, "trials": self.trials}
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+        os.replace(tmp, self.state_path)
+
+    def _completed(self, rung: int) -> List[Dict[str, Any]]:
+        return [trial for trial in self.trials if str(rung) in trial["results"]]
+
+    def _next_job(self) -> Optional[Tuple[Dict[str, Any], int]]:
+        pending = [trial for trial in self.trials if trial["status"] == "pending"]
+        if pending:
+            trial = pending[0]
+            return trial, trial["rung"]
+
+        for rung in reversed(range(len(self.rungs) - 1)):
+            finished = self._completed(rung)
+            ranked = sorted(finished, key=lambda t: t["results"][str(rung)]["score"], reverse=True)
+            for trial in ranked[: len(finished) // self.eta]:
+                if trial["status"] == "idle" and trial["rung"] == rung:
+                    return trial, rung + 1
+
+        if len(self.trials) < self.num_trials:
+            trial_id = len(self.trials)
+            rng = random.Random(self.seed * 100_003 + trial_id)
+            trial = {
+                "id": trial_id,
+                "params": sample_params(self.cfg["search_space"], rng),
+                "rung": 0,
+                "status": "idle",
+                "results": {},
+            }
+            self.trials.append(trial)
+            return trial, 0
+        return None
+
+    def _make_job(self, trial: Dict[str, Any], rung: int, device: Any) -> Dict[str, Any]:
+        previous = trial["results"].get(str(rung - 1)) if rung > 0 else None
+        prev_epochs = self.rungs[rung - 1] if previous else 0
+        return {
+            "base_cfg": self.base_cfg,
+            "params": trial["params"],
+            "epochs": self.rungs[rung] - prev_epochs,
+            "init_weights": previous["weights"] if previous else None,
+            "start_epoch": prev_epochs,
+            "total_epochs": self.rungs[-1],
+            "project_dir": str(self.sweep_dir),
+            "run_name": f"trial_{trial['id']:03d}_rung{rung}",
+            "device": device,
+        }
+
+    def run(self) -> Optional[Dict[str, Any]]:
+        free_devices = list(self.devices)
+        running: Dict[Future, Tuple[Dict[str, Any], int, Any]] = {}
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=len(self.devices),
+            mp_context=context,
+            max_tasks_per_child=1,
+        ) as pool:
+            while True:
+                while free_devices:
+                    job = self._next_job()
+                    if job is None:
+                        break
+                    trial, rung = job
+                    device = free_devices.pop(0)
+                    trial["status"], trial["rung"] = "running", rung
+                    future = pool.submit(run_trial, self._make_job(trial, rung, device))
+                    running[future] = (trial, rung, device)
+                    self.logger.info(
+                        "Trial %d -> rung %d (%d epochs) on device %s: %s",
+                        trial["id"],
+                        rung,
+                        self.rungs[rung],
+                        device,
+                        trial["params"],
+                    )
+                self._save_state()
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    trial, rung, device = running.pop(future)
+                    free_devices.append(device)
+                    try:
+                        result = future.result()
+                    except Exception as exc:  # noqa: BLE001 - a failed trial must not stop the sweep
+                        trial["status"], trial["error"] = "failed", str(exc)
+                        self.logger.warning("Trial %d failed at rung %d: %s", trial["id"], rung, exc)
+                        continue
+                    result["score"] = score_metrics(result, self.objective)
+                    trial["results"][str(rung)] = result
+                    trial["status"] = "complete" if rung == len(self.rungs) - 1 else "idle"
+                    self.logger.info(
+                        "Trial %d rung %d: score=%.4f mAP50=%.4f recall=%.4f",
+                        trial["id"],
+                        rung,
+                        result["score"],
+                        result["map50"],
+                        result["recall"],
+                    )
+                self._save_state()
+
+        return self.best_trial()
+
+    def best_trial(self) -> Optional[Dict[str, Any]]:
+        for rung in reversed(range(len(self.rungs))):
+            finished = self._completed(rung)
+            if finished:
+                return max(finished, key=lambda t: t["results"][str(rung)]["score"])
+        return None
+
+
+def main() -> None:
+    args = parse_args()
+    cfg = load_config(args.config)
+    logger = configure_logger("sweep")
+
+    sweep = AshaSweep(cfg)
+    best = sweep.run()
+    if best is None:
+        logger.warning("Sweep finished without any completed trial.")
+        return
+    top_rung = max(int(rung) for rung in best["results"])
+    logger.info(
+        "Best trial %d (rung %d, score=%.4f): %s -> %s",
+        best["id"],
+        top_rung,
+        best["results"][str(top_rung)]["score"],
+        best["params"],
+        best["results"][str(top_rung)]["weights"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import argparse
 from pathlib import Path
+from typing import Any, Dict
 
 from ultralytics import YOLO
 
 from src.config import load_config
+from src.training.cached_dataset import cached_trainer
 from src.utils.logger import configure_logger
 
 
@@ -19,20 +21,12 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def main() -> None:
-    args = parse_args()
-    cfg = load_config(args.config)
-    logger = configure_logger("train")
-
+def build_train_kwargs(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate a train config into keyword arguments for ``YOLO.train``."""
     training_cfg = cfg["training"]
     paths_cfg = cfg["paths"]
-    logging_cfg = cfg.get("logging", {})
     hardware_cfg = cfg.get("hardware", {})
-
-    model = YOLO(training_cfg["model"])
-    logger.info("Loaded model weights: %s", training_cfg["model"])
-
-    train_results = model.train(
+    return dict(
         data=paths_cfg["data_config"],
         epochs=training_cfg["epochs"],
         imgsz=training_cfg["imgsz"],
@@ -55,6 +49,26 @@ def main() -> None:
         device=hardware_cfg.get("device", 0),
         deterministic=hardware_cfg.get("deterministic", False),
     )
+
+
+def main() -> None:
+    args = parse_args()
+    cfg = load_config(args.config)
+    logger = configure_logger("train")
+
+    training_cfg = cfg["training"]
+    logging_cfg = cfg.get("logging", {})
+    cache_cfg = cfg.get("image_cache", {})
+
+    model = YOLO(training_cfg["model"])
+    logger.info("Loaded model weights: %s", training_cfg["model"])
+
+    trainer = None
+    if cache_cfg.get("enabled", False):
+        trainer = cached_trainer(cache_cfg.get("root", "data/processed/yolo_cache"))
+        logger.info("Reading images from cache shards under %s", trainer.cache_root)
+
+    train_results = model.train(trainer=trainer, **build_train_kwargs(cfg))
     logger.info("Training complete: %s", train_results)
 
     if logging_cfg.get("use_wandb", False):
@@ -1,37 +1,299 @@
 from __future__ import annotations
 
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Request/job identifiers attached to every record logged inside ``log_context``.
+_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "context",
+    "taskName",
+}
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Attach ``fields`` (e.g. ``request_id``, ``job_id``) to records logged in this block."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _context.get()
+        return True
+
+
+class ThrottleFilter(logging.Filter):
+    """Sample and rate-limit chatty records such as per-frame debug messages.
+
+    Only records at or below ``max_level`` are affected. ``sample`` keeps a
+    fraction of them per logger name; the token bucket then allows
+    ``per_second`` records (bursting to ``burst``) per message template. The
+    next record let through carries a ``suppressed`` count.
+    """
+
+    def __init__(
+        self,
+        max_level: int = logging.DEBUG,
+        per_second: float = 5.0,
+        burst: int = 20,
+        sample: Optional[Dict[str, float]] = None,
+    ) -> None:
+        super().__init__()
+        self.max_level = max_level
+        self.per_second = per_second
+        self.burst = burst
+        self.sample = sample or {}
+        self._buckets: Dict[Tuple[str, Any], Tuple[float, float]] = {}
+        self._suppressed: Dict[Tuple[str, Any], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        rate = self.sample.get(record.name)
+        if rate is not None and random.random() >= rate:
+            return False
+        if self.per_second <= 0:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.per_second)
+            if tokens < 1.0:
+                self._buckets[key] = (tokens, now)
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._buckets[key] = (tokens - 1.0, now)
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = getattr(record, "context", None)
+        if context:
+            line += " | " + " ".join(f"{key}={value}" for key, value in context.items())
+        if getattr(record, "suppressed", 0):
+            line += f" (+{record.suppressed} suppressed)"
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra=`` fields and the log context become keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        payload.update(getattr(record, "context", None) or {})
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class _PreparedQueueHandler(QueueHandler):
+    """Like ``QueueHandler`` but keeps records structured for the formatter on the writer thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _LoggingState:
+    def __init__(self) -> None:
+        self.mode = "sync"
+        self.json = False
+        self.level = logging.INFO
+        self.log_file: Optional[str] = None
+        self.max_bytes = 0
+        self.backup_count = 5
+        self.throttle: Optional[ThrottleFilter] = None
+        self.handlers: List[logging.Handler] = []
+        self.queue_handler: Optional[QueueHandler] = None
+        self.listeners: List[QueueListener] = []
+        # name -> (explicit level, per-logger log file)
+        self.loggers: Dict[str, Tuple[Optional[int], Optional[str | Path]]] = {}
+        self.lock = threading.RLock()
+
+
+_state = _LoggingState()
+
+
+def _formatter() -> logging.Formatter:
+    return JsonFormatter() if _state.json else TextFormatter()
+
+
+def _file_handler(path: str | Path) -> logging.Handler:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if _state.max_bytes > 0:
+        handler: logging.Handler = RotatingFileHandler(
+            path, maxBytes=_state.max_bytes, backupCount=_state.backup_count, encoding="utf-8"
+        )
+    else:
+        handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(_formatter())
+    return handler
+
+
+def _start_listener(handlers: List[logging.Handler]) -> QueueHandler:
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _state.listeners.append(listener)
+    return _PreparedQueueHandler(log_queue)
+
+
+def _stop_listeners(close: bool = False) -> None:
+    # Drains whatever is still queued so records logged just before exit are written.
+    while _state.listeners:
+        listener = _state.listeners.pop()
+        listener.stop()
+        if close:
+            for handler in listener.handlers:
+                handler.close()
+
+
+atexit.register(_stop_listeners)
+
+
+def _ensure_shared_handlers() -> None:
+    if _state.handlers:
+        return
+    console = logging.StreamHandler()
+    console.setFormatter(_formatter())
+    _state.handlers.append(console)
+    if _state.log_file:
+        _state.handlers.append(_file_handler(_state.log_file))
+    if _state.mode == "queue":
+        _state.queue_handler = _start_listener(_state.handlers)
+
+
+def _apply(logger: logging.Logger, level: Optional[int], log_file: Optional[str | Path]) -> None:
+    _ensure_shared_handlers()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        if handler not in _state.handlers and handler is not _state.queue_handler:
+            handler.close()
+    logger.filters = [f for f in logger.filters if not isinstance(f, (ContextFilter, ThrottleFilter))]
+
+    logger.setLevel(level if level is not None else _state.level)
+    logger.addFilter(ContextFilter())
+    if _state.throttle is not None:
+        logger.addFilter(_state.throttle)
+
+    if _state.mode == "queue":
+        logger.addHandler(_state.queue_handler)
+        if log_file:
+            logger.addHandler(_start_listener([_file_handler(log_file)]))
+    else:
+        for handler in _state.handlers:
+            logger.addHandler(handler)
+        if log_file:
+            logger.addHandler(_file_handler(log_file))
+    logger.propagate = False
+
+
+def configure_logging(settings: Optional[Dict[str, Any]] = None) -> None:
+    """Set process-wide logging behaviour from a ``logging:`` config mapping.
+
+    ``mode: queue`` hands records to a background writer thread so callers
+    never block on console/file I/O; ``format: json`` emits JSON lines;
+    ``file`` with ``max_bytes`` enables size-based rotation; ``throttle`` and
+    ``sample`` limit chatty low-level messages. Loggers already created by
+    ``configure_logger`` are rewired in place.
+    """
+    settings = settings or {}
+    with _state.lock:
+        _stop_listeners(close=True)
+        for handler in _state.handlers:
+            handler.close()
+        _state.handlers = []
+        _state.queue_handler = None
+
+        _state.mode = settings.get("mode", "sync")
+        if _state.mode not in {"sync", "queue"}:
+            raise ValueError(f"Unsupported logging mode: {_state.mode}")
+        _state.json = settings.get("format", "text") == "json"
+        _state.level = logging.getLevelName(str(settings.get("level", "INFO")).upper())
+        _state.log_file = settings.get("file")
+        _state.max_bytes = int(settings.get("max_bytes", 0))
+        _state.backup_count = int(settings.get("backup_count", 5))
+
+        throttle_cfg = settings.get("throttle")
+        sample = settings.get("sample") or {}
+        _state.throttle = None
+        if throttle_cfg or sample:
+            throttle_cfg = throttle_cfg or {}
+            _state.throttle = ThrottleFilter(
+                max_level=logging.getLevelName(str(throttle_cfg.get("max_level", "DEBUG")).upper()),
+                per_second=float(throttle_cfg.get("per_second", 0)),
+                burst=int(throttle_cfg.get("burst", 20)),
+                sample={name: float(rate) for name, rate in sample.items()},
+            )
+
+        for name, (level, log_file) in _state.loggers.items():
+            _apply(logging.getLogger(name), level, log_file)
 
 
 def configure_logger(
     name: str = "nivaro",
-    level: int = logging.INFO,
+    level: Optional[int] = None,
     log_file: Optional[str | Path] = None,
 ) -> logging.Logger:
-    """Configure and return a logger with console (and optional file) handlers."""
-    logger = logging.getLogger(name)
-    if logger.handlers:
-        return logger
-
-    logger.setLevel(level)
-    formatter = logging.Formatter(
-        "%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-
-    if log_file:
-        path = Path(log_file)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        file_handler = logging.FileHandler(path, encoding="utf-8")
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+    """Configure and return a logger with console (and optional file) handlers.
 
-    logger.propagate = False
+    Handlers, format and the default level follow ``configure_logging``.
+    """
+    logger = logging.getLogger(name)
+    with _state.lock:
+        if name in _state.loggers or logger.handlers:
+            return logger
+        _state.loggers[name] = (level, log_file)
+        _apply(logger, level, log_file)
     return logger
-
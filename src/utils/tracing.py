@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from src.utils.logger import configure_logger
+
+T = TypeVar("T")
+
+TRACE = "trace"
+PROFILE = "profile"
+
+_active: ContextVar[Optional["Tracer"]] = ContextVar("active_tracer", default=None)
+_disabled = nullcontext()
+# cProfile can only observe one run at a time without the profiles bleeding into each other.
+_profile_lock = threading.Lock()
+
+
+class Tracer:
+    """Collects timed spans for one run and exports them as Chrome trace JSON.
+
+    The output opens in ``chrome://tracing`` or https://ui.perfetto.dev.
+    """
+
+    def __init__(self, name: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.metadata = metadata or {}
+        self.events: List[Dict[str, Any]] = []
+        self.outputs: Dict[str, str] = {}
+        self._origin_ns = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def complete(self, name: str, start_ns: int, end_ns: int, **args: Any) -> None:
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "ts": (start_ns - self._origin_ns) / 1000.0,
+            "dur": (end_ns - start_ns) / 1000.0,
+            "pid": self._pid,
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.complete(name, start, time.perf_counter_ns(), **args)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per span name: count, total and self milliseconds (excluding child spans), by self time."""
+        self_us: Dict[int, float] = {}
+        by_thread: Dict[int, List[tuple]] = {}
+        for index, event in enumerate(self.events):
+            self_us[index] = event["dur"]
+            by_thread.setdefault(event["tid"], []).append((index, event))
+        for indexed in by_thread.values():
+            stack: List[tuple] = []
+            for index, event in sorted(indexed, key=lambda item: (item[1]["ts"], -item[1]["dur"])):
+                while stack and stack[-1][1] <= event["ts"]:
+                    stack.pop()
+                if stack:
+                    self_us[stack[-1][0]] -= event["dur"]
+                stack.append((index, event["ts"] + event["dur"]))
+
+        totals: Dict[str, Dict[str, float]] = {}
+        for index, event in enumerate(self.events):
+            entry = totals.setdefault(event["name"], {"count": 0, "total_ms": 0.0, "self_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += event["dur"] / 1000.0
+            entry["self_ms"] += self_us[index] / 1000.0
+        return dict(sorted(totals.items(), key=lambda item: item[1]["self_ms"], reverse=True))
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        thread_names = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+            for tid, name in self._threads.items()
+        ]
+        return {
+            "traceEvents": thread_names + self.events,
+            "displayTimeUnit": "ms",
+            "otherData": {"run": self.name, **self.metadata},
+        }
+
+    def write(self, path: str | Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_chrome_trace()), encoding="utf-8")
+        return path
+
+
+def current_tracer() -> Optional[Tracer]:
+    return _active.get()
+
+
+def span(name: str, **args: Any) -> ContextManager[None]:
+    """Time a block under the active tracer; a shared no-op when tracing is off."""
+    tracer = _active.get()
+    if tracer is None:
+        return _disabled
+    return tracer.span(name, **args)
+
+
+def traced_iter(
+    iterable: Iterable[T],
+    name: str,
+    args_fn: Optional[Callable[[T], Dict[str, Any]]] = None,
+) -> Iterable[T]:
+    """Record each ``next()`` of ``iterable`` as a span, e.g. decode + inference of a stream.
+
+    Returns ``iterable`` untouched when tracing is off.
+    """
+    tracer = _active.get()
+    if tracer is None:
+        return iterable
+
+    def generate() -> Iterator[T]:
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter_ns()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            tracer.complete(name, start, time.perf_counter_ns(), **(args_fn(item) if args_fn else {}))
+            yield item
+
+    return generate()
+
+
+def parse_trace_mode(value: Optional[str | bool]) -> Optional[str]:
+    """Map a flag/header/config value to ``None``, ``"trace"`` or ``"profile"``."""
+    if value is None or value is False:
+        return None
+    text = str(value).strip().lower()
+    if text in {"", "0", "false", "off", "none", "no"}:
+        return None
+    return PROFILE if text == PROFILE else TRACE
+
+
+@contextmanager
+def trace_run(
+    name: str,
+    output_dir: str | Path = "reports/traces",
+    mode: Optional[str] = TRACE,
+    metadata: Optional[Dict[str, Any]] = None,
+    keep_last: Optional[int] = None,
+) -> Iterator[Optional[Tracer]]:
+    """Trace everything run in this block and write ``<name>.trace.json`` to ``output_dir``.
+
+    ``mode="profile"`` additionally captures a cProfile ``<name>.prof`` of the
+    calling thread. Yields ``None`` (and records nothing) when ``mode`` is
+    falsy; nested runs reuse the outer tracer. ``keep_last`` prunes older
+    trace/profile files in ``output_dir`` beyond that many. ``name`` must be a
+    plain file name, never a path.
+    """
+    if not name or name in {".", ".."} or any(sep in name for sep in ("/", "\\")):
+        raise ValueError(f"Trace name must not contain path separators: {name!r}")
+    if not mode or _active.get() is not None:
+        yield _active.get()
+        return
+
+    logger = configure_logger("tracing")
+    tracer = Tracer(name, metadata)
+    token = _active.set(tracer)
+    profiler: Optional[cProfile.Profile] = None
+    if mode == PROFILE:
+        if _profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as exc:  # another profiler is already active
+                logger.warning("cProfile unavailable for %s: %s", name, exc)
+                profiler = None
+                _profile_lock.release()
+        else:
+            logger.warning("Another run is being profiled; tracing %s without cProfile", name)
+
+    output_dir = Path(output_dir)
+    try:
+        with tracer.span(f"run.{name}"):
+            yield tracer
+    finally:
+        _active.reset(token)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+            output_dir.mkdir(parents=True, exist_ok=True)
+            profile_path = output_dir / f"{name}.prof"
+            profiler.dump_stats(profile_path)
+            tracer.outputs["profile"] = str(profile_path)
+        tracer.outputs["trace"] = str(tracer.write(output_dir / f"{name}.trace.json"))
+        hotspots = ", ".join(
+            f"{span_name} {entry['self_ms']:.1f}ms"
+            for span_name, entry in list(tracer.summary().items())[:3]
+        )
+        logger.info("Trace for %s -> %s (self time: %s)", name, tracer.outputs["trace"], hotspots)
+        if keep_last is not None:
+            _prune(output_dir, keep_last)
+
+
+def _prune(output_dir: Path, keep_last: int) -> None:
+    for pattern in ("*.trace.json", "*.prof"):
+        files = sorted(output_dir.glob(pattern), key=lambda path: path.stat().st_mtime, reverse=True)
+        for stale in files[keep_last:]:
+            stale.unlink(missing_ok=True)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import cv2
+import numpy as np
+
+from src.data.dataset_utils import list_image_files
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def iter_frames(source: str | int) -> Iterator[Tuple[str, np.ndarray]]:
+    """Yield ``(path, BGR frame)`` from a video file/stream, an image, or an image directory."""
+    path = Path(str(source))
+    if path.is_dir():
+        for image_path in list_image_files(path):
+            frame = cv2.imread(str(image_path))
+            if frame is not None:
+                yield str(image_path), frame
+        return
+    if path.suffix.lower() in IMAGE_SUFFIXES:
+        frame = cv2.imread(str(path))
+        if frame is None:
+            raise FileNotFoundError(f"Image not found: {path}")
+        yield str(path), frame
+        return
+
+    capture = cv2.VideoCapture(int(source) if str(source).isdigit() else str(source))
+    if not capture.isOpened():
+        raise FileNotFoundError(f"Unable to open video source: {source}")
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield str(source), frame
+    finally:
+        capture.release()